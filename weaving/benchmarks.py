@@ -0,0 +1,178 @@
+"""
+Micro-benchmarks for parts of the `weaving` build pipeline, run against the site's own
+pages with `python -m weaving.benchmarks [BENCHMARK]`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import pathlib
+import time
+from typing import TYPE_CHECKING
+
+from weaving import config, discovery, highlight, markdown, template
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def _load_pages(path: pathlib.Path) -> list[str]:
+    async def load() -> list[str]:
+        return [
+            (await markdown.read_markdown(entry.path))[0]
+            async for entry in discovery.find_files(path, suffix=".md")
+        ]
+
+    return asyncio.run(load())
+
+
+def _time_per_call[T](
+    func: Callable[[T], object], pages: list[T], rounds: int
+) -> float:
+    """Run `func` over every page `rounds` times, returning the mean ms per call."""
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        for page in pages:
+            func(page)
+    return (time.perf_counter_ns() - start) / (rounds * len(pages)) / 1_000_000
+
+
+def _report(name: str, results: dict[str, float]) -> None:
+    baseline = next(iter(results.values()))
+    print(f"{name}:")
+    for variant, ms in results.items():
+        print(f"  {variant:<24} {ms:8.3f}ms/page  {baseline / ms:5.2f}x")
+
+
+def bench_markdown_engine(pages: list[str], rounds: int) -> None:
+    """Compare a new Markdown converter per page against reusing a `MarkdownEngine`."""
+    engine = markdown.MarkdownEngine()
+    _report(
+        "markdown engine",
+        {
+            "new engine per page": _time_per_call(
+                lambda page: markdown.MarkdownEngine().convert(page), pages, rounds
+            ),
+            "reused engine": _time_per_call(engine.convert, pages, rounds),
+        },
+    )
+
+
+def bench_highlight(pages: list[str], rounds: int) -> None:
+    """
+    Compare highlighting every code block again against the highlighting cache, on the
+    pages with code blocks, which other pages would otherwise drown out.
+    """
+    engine = markdown.MarkdownEngine()
+    pages = [
+        page
+        for page in pages
+        if "markdown.extensions.codehilite" in markdown.find_extensions(page)
+    ]
+
+    def uncached(page: str) -> object:
+        highlight.clear()
+        return engine.convert(page)
+
+    _report(
+        "highlight",
+        {
+            "uncached": _time_per_call(uncached, pages, rounds),
+            "cached": _time_per_call(engine.convert, pages, rounds),
+        },
+    )
+
+
+def bench_templates(pages: list[str], rounds: int) -> None:
+    """Compare rendering each page's template in Jinja's async and sync modes."""
+    cfg = config.SiteGeneratorConfig(
+        command="build",
+        site_name="Benchmark",
+        base=pathlib.Path(),
+        templates=pathlib.Path("./templates"),
+        pages=pathlib.Path("./pages"),
+        static=pathlib.Path("./static"),
+        output=pathlib.Path("./output"),
+    )
+    engine = markdown.MarkdownEngine()
+    now = markdown.get_rendered_at()
+    contexts = []
+    for page in pages:
+        rendered = engine.convert(page)
+        contexts.append(
+            template.TemplateContext(
+                content=rendered.html,
+                frontmatter=markdown.parse_frontmatter(cfg, cfg.pages / "index.md", {}),
+                rendered_at=now,
+                modified_at=now,
+                git_sha="0" * 40,
+                info=rendered.info,
+            )
+        )
+
+    async_renderer = template.TemplateRenderer(cfg.templates, is_async=True)
+    sync_renderer = template.TemplateRenderer(cfg.templates)
+    loop = asyncio.new_event_loop()
+    try:
+        _report(
+            "templates",
+            {
+                "async mode": _time_per_call(
+                    lambda ctx: loop.run_until_complete(
+                        async_renderer.render_async(ctx)
+                    ),
+                    contexts,
+                    rounds,
+                ),
+                "sync mode": _time_per_call(sync_renderer.render, contexts, rounds),
+            },
+        )
+    finally:
+        loop.close()
+
+
+BENCHMARKS: dict[str, Callable[[list[str], int], None]] = {
+    "markdown": bench_markdown_engine,
+    "highlight": bench_highlight,
+    "templates": bench_templates,
+}
+
+
+def main() -> None:
+    """Run the `weaving` benchmarks CLI."""
+    parser = argparse.ArgumentParser(prog="weaving.benchmarks")
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="BENCHMARK",
+        help=f"Benchmarks to run, one or more of {', '.join(BENCHMARKS)}.",
+    )
+    parser.add_argument(
+        "--pages",
+        "-p",
+        type=pathlib.Path,
+        default="./pages",
+        metavar="PATH",
+        help="Markdown pages to benchmark with.",
+    )
+    parser.add_argument(
+        "--rounds",
+        "-r",
+        type=int,
+        default=5,
+        metavar="N",
+        help="Number of times to process every page.",
+    )
+    args = parser.parse_args()
+    if unknown := set(args.benchmarks) - set(BENCHMARKS):
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    pages = [page for page in _load_pages(args.pages) if page]
+    print(f"Benchmarking with {len(pages)} pages, {args.rounds} rounds\n")
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](pages, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
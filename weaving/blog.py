@@ -1,48 +1,130 @@
-import datetime
+from __future__ import annotations
+
 import math
-import pathlib
+from typing import TYPE_CHECKING, Any
+
+import pydantic
 
-import bs4
+from weaving import (
+    cache,
+    config,
+    frontmatter,
+    logging,
+    manifest,
+    markdown,
+    template,
+    writer,
+)
 
-from weaving import config, frontmatter, logging, markdown, template
+if TYPE_CHECKING:
+    import datetime
+    import pathlib
+
+    from weaving import registry, site_model, workers
 
 LOGGER = logging.getLogger()
 
 
+class PostMetadata(pydantic.BaseModel):
+    """
+    Everything a blog index needs from a blog post.
+
+    Post metadata is kept in the persistent build cache, keyed by the post's contents,
+    so it is shared by every build using the same cache. That lets the shard of a
+    sharded build that renders a blog index reuse the metadata of posts rendered by
+    other shards, instead of rendering every post again.
+    """
+
+    frontmatter: dict[str, Any]
+    """The raw YAML frontmatter values of the post."""
+
+    preview: str
+    """Blog post preview."""
+
+
+def get_preview(content: markdown.RenderedMarkdown) -> str:
+    """
+    Get the preview of a blog post from its rendered content, which is the text of its
+    first paragraph.
+    """
+    if content.info.preview is None:
+        return "This page has no paragraphs, please add some content!"
+    return content.info.preview
+
+
+def get_cached_post(
+    cfg: config.SiteGeneratorConfig, digest: str
+) -> PostMetadata | None:
+    """Get the cached metadata of the post whose source file has the hash `digest`."""
+    if not (posts := _post_cache(cfg)):
+        return None
+    if (value := posts.get(_post_cache_key(digest))) is None:
+        return None
+    return PostMetadata.model_validate_json(value)
+
+
+def cache_post(
+    cfg: config.SiteGeneratorConfig, digest: str, metadata: PostMetadata
+) -> None:
+    """Cache the metadata of the post whose source file has the hash `digest`."""
+    if posts := _post_cache(cfg):
+        posts.set_text(_post_cache_key(digest), metadata.model_dump_json())
+
+
+def _post_cache(cfg: config.SiteGeneratorConfig) -> cache.DiskCache | None:
+    return cache.DiskCache(cfg.cache / "posts") if cfg.cache else None
+
+
+def _post_cache_key(digest: str) -> str:
+    return manifest.hash_values(markdown.get_render_fingerprint(), digest)
+
+
 async def find_blog_posts(
-    cfg: config.SiteGeneratorConfig, path: pathlib.Path
+    cfg: config.SiteGeneratorConfig,
+    path: pathlib.Path,
+    site: site_model.SiteModel,
+    pages: registry.PageRegistry,
+    renderer: workers.Renderer,
 ) -> list[template.BlogIndexPostContext]:
     """
     Generate and return all the additional info the `"blog_index"` page type requires.
 
-    The `path` should be the path to the `"blog_index"` markdown page.
+    The `path` should be the path to the `"blog_index"` markdown page. Its posts are the
+    `"blog"` pages it is the nearest `"blog_index"` parent of, which are found with
+    their frontmatter in the `site` model. Posts rendered earlier in the build are
+    taken from the `pages` registry, and only posts that weren't, and don't have a
+    cached preview, are read and rendered again.
     """
-    search_dir = path.parent
-
     posts: list[template.BlogIndexPostContext] = []
-    async for post in markdown.find_markdown(search_dir):
-        if post == path:
+    for post, summary in site.find_blog_posts(path):
+        if page := pages.get(post):
+            posts.append(
+                template.BlogIndexPostContext(
+                    frontmatter=page.frontmatter, preview=page.preview
+                )
+            )
             continue
 
-        # Read post contents & frontmatter
-        content, fm = await markdown.load_markdown(cfg, post)
+        fm = markdown.parse_frontmatter(cfg, post, summary.frontmatter)
         if not fm.date:
             raise ValueError("Cannot render blog post without a date")
         if fm.debug and not cfg.debug_pages:
             LOGGER.debug(f"Skipping debug blog page: {path}")
             continue
 
-        # Generate a preview of the post
-        content = await markdown.render(content)
-        first_p = bs4.BeautifulSoup(content, features="html.parser").find("p")
-        preview = (
-            first_p.get_text()
-            if first_p
-            else "This page has no paragraphs, please add some content!"
+        # Generate a preview of the post, unless another build already has
+        digest = summary.digest or manifest.hash_file(post)
+        metadata = get_cached_post(cfg, digest)
+        if not metadata:
+            content = await markdown.read_content(post)
+            preview = get_preview(await renderer.render_markdown(content, fm.markdown))
+            metadata = PostMetadata(frontmatter=summary.frontmatter, preview=preview)
+            cache_post(cfg, digest, metadata)
+
+        posts.append(
+            template.BlogIndexPostContext(frontmatter=fm, preview=metadata.preview)
         )
 
-        posts.append(template.BlogIndexPostContext(frontmatter=fm, preview=preview))
-
     # Sort post by their date
     def sort_frontmatter(t: template.BlogIndexPostContext) -> datetime.date:
         if not t.frontmatter.date:
@@ -58,9 +140,13 @@ async def blog_index_pipeline(
     path: pathlib.Path,
     fm: frontmatter.PageFrontmatter,
     ctx: template.TemplateContext,
-) -> pathlib.Path:
+    site: site_model.SiteModel,
+    pages: registry.PageRegistry,
+    renderer: workers.Renderer,
+    output_writer: writer.OutputWriter,
+) -> list[pathlib.Path]:
     """
-    Render pipeline for a `blog_index` page, returning the path to the first rendered
+    Render pipeline for a `blog_index` page, returning the paths to every rendered
     output page.
 
     To avoid having one massive index page, the a blog index is paginated into `N`
@@ -68,45 +154,45 @@ async def blog_index_pipeline(
     `/_/${page_num}/index.html` relative to the first index page. The number `1`
     page is also written out as a redirect to the first index page for convenience.
     """
-    posts = await find_blog_posts(cfg, path)
+    posts = await find_blog_posts(cfg, path, site, pages, renderer)
     root_output = fm.get_output_path()
 
     page_size = cfg.blog_posts_per_page
     max_pages = math.ceil(len(posts) / page_size)
 
+    jinja = template.jinja(cfg.templates, cfg.cache)
+    outputs: list[pathlib.Path] = []
+
     for page_idx in range(0, len(posts), page_size):
         current_page = (page_idx // page_size) + 1
 
-        ctx = template.BlogIndexTemplateContext(
-            **ctx.model_dump(),
+        page_ctx = template.BlogIndexTemplateContext(
+            **dict(ctx),
             posts=posts[page_idx : page_idx + page_size],
             current_page=current_page,
             max_pages=max_pages,
         )
-        html = await template.jinja(cfg.templates).render(ctx)
+        output = root_output
+        if page_idx:
+            output = root_output.parent / "_" / str(current_page) / "index.html"
+        await output_writer.write_chunks(output, jinja.generate(page_ctx))
+        outputs.append(output)
 
         if page_idx == 0:
-            root_output.parent.mkdir(parents=True, exist_ok=True)
-            root_output.write_text(html)
-
             output = root_output.parent / "_" / "1" / "index.html"
-            output.parent.mkdir(parents=True, exist_ok=True)
-
-            output.write_text(
+            await output_writer.write_text(
+                output,
                 "<html>"
                 "<head>"
                 '<meta http-equiv="refresh" content="0; '
                 f'url=/{root_output.parent.relative_to(cfg.output)!s}"/>'
                 "</head>"
-                "</html>"
+                "</html>",
             )
-        else:
-            output = root_output.parent / "_" / str(current_page) / "index.html"
-            output.parent.mkdir(parents=True, exist_ok=True)
-            output.write_text(html)
+            outputs.append(output)
 
         LOGGER.debug(
             f"wrote blog posts {page_idx} to {page_idx + page_size} to {output}"
         )
 
-    return root_output
+    return outputs
@@ -0,0 +1,79 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from weaving import (
+    blog,
+    config,
+    config_test,
+    manifest,
+    pipeline,
+    registry,
+    site_model,
+    workers,
+)
+
+
+def _make_blog(tmp_path: pathlib.Path) -> config.SiteGeneratorConfig:
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "default.html").write_text("{{ ctx.content|render }}")
+    (templates / "blog_index.html").write_text(
+        "{{ ctx.current_page }}/{{ ctx.max_pages }}: "
+        "{% for post in ctx.posts %}{{ post.preview }} {% endfor %}"
+    )
+
+    posts = tmp_path / "pages" / "blog"
+    posts.mkdir(parents=True)
+    (posts / "index.md").write_text("---\ntype: blog_index\n---\n")
+    for day in range(1, 4):
+        (posts / f"post-{day}.md").write_text(
+            f"---\ntype: blog\ndate: 2024-01-0{day}\n---\n\nPost {day}\n"
+        )
+    (tmp_path / "static").mkdir()
+
+    return config_test.fake_test_config(
+        base=tmp_path,
+        templates=templates,
+        pages=tmp_path / "pages",
+        static=tmp_path / "static",
+        output=tmp_path / "output",
+        site_name="test",
+        blog_posts_per_page=2,
+    )
+
+
+def test_blog_index_pagination(tmp_path: pathlib.Path) -> None:
+    cfg = _make_blog(tmp_path)
+    asyncio.run(pipeline.pipeline(cfg))
+
+    output = tmp_path / "output" / "blog"
+    assert (output / "index.html").read_text() == "1/2: Post 3 Post 2"
+    assert (output / "_" / "2" / "index.html").read_text() == "2/2: Post 1"
+
+
+def test_find_blog_posts__digest(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cfg = _make_blog(tmp_path)
+    site = site_model.SiteModel()
+    for page in sorted((cfg.pages / "blog").iterdir()):
+        site.add_page(page, page.stat(), digest=f"digest-{page.stem}")
+
+    # Posts that weren't rendered in the build use the digest from discovery
+    def hash_file(path: pathlib.Path) -> str:
+        raise AssertionError(f"{path} was hashed again")
+
+    monkeypatch.setattr(manifest, "hash_file", hash_file)
+    with workers.Renderer(cfg) as renderer:
+        posts = asyncio.run(
+            blog.find_blog_posts(
+                cfg,
+                cfg.pages / "blog" / "index.md",
+                site,
+                registry.PageRegistry(),
+                renderer,
+            )
+        )
+    assert [post.preview for post in posts] == ["Post 3", "Post 2", "Post 1"]
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import os
+import pathlib
+import tempfile
+import threading
+
+from weaving import logging
+
+LOGGER = logging.getLogger()
+
+
+class DiskCache:
+    """
+    A persistent, content-addressed cache of values stored as files on disk.
+
+    Keys must be derived only from the content that produced a value, never from paths
+    or timestamps, so a clean checkout of the same content gets cache hits. Reading an
+    entry updates its modification time, which `evict` uses to find the least recently
+    used entries.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+    def get(self, key: str) -> bytes | None:
+        """Get the cached value for `key`, or `None` if it isn't cached."""
+        path = self._entry_path(key)
+        try:
+            value = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """
+        Cache `value` for `key`.
+
+        Entries are written to a temporary file then renamed into place, so concurrent
+        readers and writers never see a partial entry.
+        """
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        tmp = pathlib.Path(name)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(value)
+            tmp.replace(path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def get_text(self, key: str) -> str | None:
+        """Get the cached UTF-8 text for `key`, or `None` if it isn't cached."""
+        value = self.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set_text(self, key: str, value: str) -> None:
+        """Cache UTF-8 text `value` for `key`."""
+        self.set(key, value.encode("utf-8"))
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        # Spread entries over sub-directories to keep directory listings small
+        return self.path / key[:2] / key
+
+
+class MemoryCache[K, V]:
+    """
+    An in-memory cache of at most `max_size` values, which discards the least recently
+    used values first.
+
+    Memory caches are thread safe, so one can be shared by every thread in a process.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._values: collections.OrderedDict[K, V] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        """Get the cached value for `key`, or `None` if it isn't cached."""
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        """Cache `value` for `key`, discarding the least recently used value if full."""
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def clear(self) -> None:
+        """Discard every cached value."""
+        with self._lock:
+            self._values.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+def evict(path: pathlib.Path, max_size: int) -> int:
+    """
+    Delete the least recently used entries of every cache under `path` until their total
+    size is at most `max_size` bytes, returning the number of entries deleted.
+    """
+    entries: list[tuple[float, int, pathlib.Path]] = []
+    total = 0
+    for entry in path.rglob("*"):
+        with contextlib.suppress(OSError):
+            stat = entry.stat()
+            if entry.is_file():
+                entries.append((stat.st_mtime, stat.st_size, entry))
+                total += stat.st_size
+
+    deleted = 0
+    for _, size, entry in sorted(entries):
+        if total <= max_size:
+            break
+        with contextlib.suppress(FileNotFoundError):
+            entry.unlink()
+        total -= size
+        deleted += 1
+
+    if deleted:
+        LOGGER.debug(f"Evicted {deleted} least recently used cache entries")
+    return deleted
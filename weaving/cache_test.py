@@ -0,0 +1,46 @@
+import os
+import pathlib
+
+from weaving import cache
+
+
+def test_disk_cache(tmp_path: pathlib.Path) -> None:
+    disk_cache = cache.DiskCache(tmp_path / "test")
+    assert disk_cache.get("abcdef") is None
+
+    disk_cache.set_text("abcdef", "hello 👋")
+    assert disk_cache.get_text("abcdef") == "hello 👋"
+    assert (tmp_path / "test" / "ab" / "abcdef").is_file()
+
+    disk_cache.set_text("abcdef", "goodbye")
+    assert disk_cache.get_text("abcdef") == "goodbye"
+
+
+def test_evict(tmp_path: pathlib.Path) -> None:
+    disk_cache = cache.DiskCache(tmp_path / "test")
+    for idx, key in enumerate(["aa1", "bb2", "cc3"]):
+        disk_cache.set(key, b"x" * 10)
+        os.utime(tmp_path / "test" / key[:2] / key, (idx, idx))
+
+    # Reading an entry marks it as recently used
+    assert disk_cache.get("aa1") is not None
+
+    assert cache.evict(tmp_path, 20) == 1
+    assert disk_cache.get("aa1") is not None
+    assert disk_cache.get("bb2") is None
+    assert disk_cache.get("cc3") is not None
+
+    assert cache.evict(tmp_path, 20) == 0
+
+
+def test_memory_cache() -> None:
+    memory_cache: cache.MemoryCache[str, int] = cache.MemoryCache(2)
+    memory_cache.set("a", 1)
+    memory_cache.set("b", 2)
+
+    # Reading an entry marks it as recently used
+    assert memory_cache.get("a") == 1
+    memory_cache.set("c", 3)
+    assert memory_cache.get("a") == 1
+    assert memory_cache.get("b") is None
+    assert (memory_cache.get("c"), len(memory_cache)) == (3, 2)
@@ -6,7 +6,10 @@ from typing import Protocol, override
 
 import anyio
 
-from weaving import config, dev, errors, logging, pipeline, validation
+from weaving import config, daemon, errors, logging
+
+# The modules that implement each command are imported when the command runs, so the
+# CLI starts quickly when it only needs to send the command to a running daemon.
 
 LOGGER = logging.getLogger()
 
@@ -19,8 +22,8 @@ class Command(Protocol):
         """Setup and command specific CLI flags & args."""
 
     @classmethod
-    async def run(cls, cfg: config.SiteGeneratorConfig) -> None:
-        """Run the command."""
+    async def run(cls, cfg: config.SiteGeneratorConfig) -> int | None:
+        """Run the command, returning a non-zero exit code if it failed."""
 
 
 class Build(Command):
@@ -36,10 +39,70 @@ class Build(Command):
             metavar="HOST",
             help="Hostname the site will be hosted under.",
         )
+        parser.add_argument(
+            "--incremental",
+            default=False,
+            action="store_true",
+            help="Only rebuild files that changed since the previous build.",
+        )
+        parser.add_argument(
+            "--static-checksum",
+            default=False,
+            action="store_true",
+            help="Detect changed static files by their contents, not size and mtime.",
+        )
+        parser.add_argument(
+            "--static-copy",
+            choices=["auto", "reflink", "hardlink", "copy"],
+            default="auto",
+            help="How changed static files are copied to the output directory.",
+        )
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            default=0,
+            metavar="N",
+            help=(
+                "Render pages on N worker processes, 0 uses one per CPU and 1 renders "
+                "pages in-process."
+            ),
+        )
+        parser.add_argument(
+            "--stage-concurrency",
+            default=[],
+            action="append",
+            type=str,
+            metavar="STAGE=N",
+            help="Run N concurrent workers for a build pipeline stage.",
+        )
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=64,
+            metavar="N",
+            help="Maximum number of files queued between build pipeline stages.",
+        )
+        parser.add_argument(
+            "--trace",
+            type=pathlib.Path,
+            default=None,
+            metavar="FILE",
+            help="Write a Chrome trace of the build to FILE and summarize its timings.",
+        )
+        parser.add_argument(
+            "--shard",
+            type=str,
+            default=None,
+            metavar="I/N",
+            help="Only build shard I of N of the site, to be combined with merge.",
+        )
 
     @override
     @classmethod
     async def run(cls, cfg: config.SiteGeneratorConfig) -> None:
+        from weaving import pipeline  # noqa: PLC0415
+
         await pipeline.pipeline(cfg)
 
 
@@ -66,7 +129,9 @@ class Validate(Command):
 
     @override
     @classmethod
-    async def run(cls, cfg: config.SiteGeneratorConfig) -> None:
+    async def run(cls, cfg: config.SiteGeneratorConfig) -> int | None:
+        from weaving import validation  # noqa: PLC0415
+
         LOGGER.info("Starting site validation")
 
         count = 0
@@ -79,9 +144,56 @@ class Validate(Command):
 
         if count > 0:
             LOGGER.error(f"{count} validation error{'s' if count > 1 else ''} found")
-            sys.exit(count)
+            return count
 
         LOGGER.info("No validation errors found")
+        return None
+
+
+class Merge(Command):
+    """Combine the outputs of a sharded build into a single site."""
+
+    @override
+    @classmethod
+    def setup(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "shards",
+            nargs="+",
+            type=pathlib.Path,
+            metavar="SHARD",
+            help="Output directory of each shard build.",
+        )
+
+    @override
+    @classmethod
+    async def run(cls, cfg: config.SiteGeneratorConfig) -> None:
+        from weaving import shards  # noqa: PLC0415
+
+        await shards.merge(cfg)
+
+
+class CompileTemplates(Command):
+    """Compile every template into the persistent build cache ahead of time."""
+
+    @override
+    @classmethod
+    def setup(cls, parser: argparse.ArgumentParser) -> None:
+        pass
+
+    @override
+    @classmethod
+    async def run(cls, cfg: config.SiteGeneratorConfig) -> None:
+        from weaving import template  # noqa: PLC0415
+
+        if not cfg.cache:
+            raise errors.WeavingError("Cannot compile templates without a --cache")
+
+        names = template.jinja(cfg.templates, cfg.cache).compile_templates()
+        LOGGER.info(
+            f"Compiled {len(names)} templates from "
+            f"{cfg.format_relative_path(cfg.templates)} into "
+            f"{cfg.format_relative_path(cfg.cache)}"
+        )
 
 
 class Dev(Command):
@@ -105,16 +217,79 @@ class Dev(Command):
             metavar="PORT",
             help="Port number to listen on when running in dev mode.",
         )
+        parser.add_argument(
+            "--incremental",
+            default=False,
+            action="store_true",
+            help="Only rebuild files that changed since the previous build.",
+        )
+        parser.add_argument(
+            "--static-checksum",
+            default=False,
+            action="store_true",
+            help="Detect changed static files by their contents, not size and mtime.",
+        )
+        parser.add_argument(
+            "--static-copy",
+            choices=["auto", "reflink", "hardlink", "copy"],
+            default="auto",
+            help="How changed static files are copied to the output directory.",
+        )
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            default=0,
+            metavar="N",
+            help=(
+                "Render pages on N worker processes, 0 uses one per CPU and 1 renders "
+                "pages in-process."
+            ),
+        )
+        parser.add_argument(
+            "--stage-concurrency",
+            default=[],
+            action="append",
+            type=str,
+            metavar="STAGE=N",
+            help="Run N concurrent workers for a build pipeline stage.",
+        )
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=64,
+            metavar="N",
+            help="Maximum number of files queued between build pipeline stages.",
+        )
 
     @override
     @classmethod
     async def run(cls, cfg: config.SiteGeneratorConfig) -> None:
+        from weaving import dev  # noqa: PLC0415
+
         await dev.watch_and_serve(cfg)
 
 
+class Daemon(Command):
+    """Run build and validate commands for the CLI with warm caches."""
+
+    @override
+    @classmethod
+    def setup(cls, parser: argparse.ArgumentParser) -> None:
+        pass
+
+    @override
+    @classmethod
+    async def run(cls, cfg: config.SiteGeneratorConfig) -> None:
+        await daemon.Daemon(cfg, run_command).serve()
+
+
 _COMMANDS: dict[str, type[Command]] = {
     "build": Build,
+    "compile-templates": CompileTemplates,
+    "daemon": Daemon,
     "dev": Dev,
+    "merge": Merge,
     "validate": Validate,
 }
 
@@ -161,6 +336,49 @@ def setup_argparse() -> argparse.ArgumentParser:
         metavar="PATH",
         help="Rendered file output location.",
     )
+    parser.add_argument(
+        "--ignore",
+        default=[],
+        action="append",
+        type=str,
+        metavar="PATTERN",
+        help="Leave pages and static files matching PATTERN out of the site.",
+    )
+    parser.add_argument(
+        "--cache",
+        type=pathlib.Path,
+        default="./.weaving_cache",
+        metavar="PATH",
+        help="Persistent build cache location.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_const",
+        const=None,
+        dest="cache",
+        help="Disable the persistent build caches.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="Maximum size of the persistent build caches.",
+    )
+    parser.add_argument(
+        "--socket",
+        type=pathlib.Path,
+        default="./.weaving.sock",
+        metavar="PATH",
+        help="Unix socket the daemon listens on.",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_const",
+        const=None,
+        dest="socket",
+        help="Run commands in-process, even when a daemon is running.",
+    )
     parser.add_argument(
         "--verbose",
         "-v",
@@ -223,13 +441,27 @@ async def main() -> int:
     for key, value in cfg.model_dump().items():
         logger.debug(f"config.{key} = {value}")
 
+    try:
+        code = await daemon.request(cfg)
+    except errors.WeavingError as ex:
+        LOGGER.error(ex)  # noqa: TRY400
+        LOGGER.debug(ex, exc_info=ex)
+        return 1
+    if code is not None:
+        return code
+
+    return await run_command(cfg)
+
+
+async def run_command(cfg: config.SiteGeneratorConfig) -> int:
+    """Run the command selected by `cfg.command` in-process, returning its exit code."""
     try:
         cmd = _COMMANDS[cfg.command]
     except KeyError:
         raise ValueError(f"Unknown command name '{cfg.command}'") from None
 
     try:
-        await cmd.run(cfg)
+        return await cmd.run(cfg) or 0
     except errors.WeavingError as ex:
         LOGGER.error(ex)  # noqa: TRY400
         LOGGER.debug(ex, exc_info=ex)
@@ -237,5 +469,3 @@ async def main() -> int:
     except Exception as ex:
         LOGGER.exception(ex)  # noqa: TRY401
         return 1
-
-    return 0
@@ -3,10 +3,13 @@ from __future__ import annotations
 import contextlib
 import pathlib
 import re  # noqa: TC003
+from typing import Any, Literal
 
 import pydantic
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+CopyMethod = Literal["auto", "reflink", "hardlink", "copy"]
+
 
 class SiteGeneratorConfig(BaseSettings):
     """General configuration values for `weaving`, populated from CLI args."""
@@ -19,6 +22,50 @@ class SiteGeneratorConfig(BaseSettings):
     """Enable verbose debug logging."""
     debug_pages: bool = True
     """Include `debug` type pages in the generated site output."""
+    incremental: bool = False
+    """
+    Only rebuild source files whose inputs changed since the previous build, instead of
+    clearing the output directory and rebuilding everything.
+    """
+    static_checksum: bool = False
+    """
+    Compare static files to the previous build by their contents, rather than by their
+    size and modification time.
+    """
+    static_copy: CopyMethod = "auto"
+    """
+    How changed static files are copied to the output directory. `"auto"` tries a
+    reflink, then `os.copy_file_range`, then a regular copy.
+    """
+    jobs: int = 0
+    """
+    The number of worker processes to render pages with. `0` starts one worker per
+    available CPU, and `1` renders pages in-process.
+    """
+    stage_concurrency: dict[str, int] = pydantic.Field(default_factory=dict)
+    """
+    The number of concurrent workers to run for each build pipeline stage, keyed by
+    stage name. Stages not included use their default concurrency.
+    """
+    queue_size: int = 64
+    """The maximum number of files queued between each build pipeline stage."""
+    trace: pathlib.Path | None = None
+    """
+    Write a Chrome trace-event file of the time spent building each file to this path,
+    and log a summary of the slowest stages and pages.
+    """
+    shard: tuple[int, int] | None = None
+    """
+    Only build shard `I` of `N` of the site's source files, as `(I, N)`, for the `merge`
+    command to combine with the other shards. `None` builds every source file.
+    """
+    shards: list[pathlib.Path] = pydantic.Field(default_factory=list)
+    """The output directories of the shard builds for the `merge` command to combine."""
+    socket: pathlib.Path | None = None
+    """
+    The Unix socket the daemon listens on. Commands are sent to a daemon listening here
+    if there is one, otherwise they run in-process. `None` always runs in-process.
+    """
 
     base: pathlib.Path
     """The base directory the site generator is running from."""
@@ -30,6 +77,22 @@ class SiteGeneratorConfig(BaseSettings):
     """The root directory from which to discover static files."""
     output: pathlib.Path
     """The root directory to write out generated site files."""
+    ignore: list[str] = pydantic.Field(default_factory=list)
+    """
+    Patterns for pages and static files to leave out of the site, on top of the editor
+    and file browser files that are always ignored. A pattern without a `/` matches file
+    and directory names, a pattern with a `/` matches paths relative to `base`.
+    """
+    cache: pathlib.Path | None = None
+    """
+    The root directory to keep persistent build caches in, caching is disabled if not
+    set.
+    """
+    cache_size: int = 256
+    """
+    The maximum total size of the persistent build caches in megabytes, the least
+    recently used cache entries are evicted after each build to stay within this size.
+    """
 
     default_template: str = "default.html"
     """The default template name, used when a page doesn't specify a template."""
@@ -55,7 +118,45 @@ class SiteGeneratorConfig(BaseSettings):
     site_name: str | None = None
     """The site name for OpenGraph tags or other purposes."""
 
-    @pydantic.field_validator("templates", "pages", "static", "base", "output")
+    @pydantic.field_validator("stage_concurrency", mode="before")
+    @classmethod
+    def parse_stage_concurrency(cls, value: Any) -> Any:
+        """
+        Pydantic validator to parse `"stage=N"` strings from the CLI into a dict of
+        stage names to concurrency.
+        """
+        if not isinstance(value, list):
+            return value
+
+        stages: dict[str, str] = {}
+        for item in value:
+            stage, sep, concurrency = str(item).partition("=")
+            if not sep:
+                raise ValueError(f"expected STAGE=N, got {item!r}")
+            stages[stage.strip()] = concurrency.strip()
+        return stages
+
+    @pydantic.field_validator("shard", mode="before")
+    @classmethod
+    def parse_shard(cls, value: Any) -> Any:
+        """Pydantic validator to parse `"I/N"` strings from the CLI into a shard."""
+        if not isinstance(value, str):
+            return value
+
+        index, sep, count = value.partition("/")
+        if not sep:
+            raise ValueError(f"expected I/N, got {value!r}")
+        return (index.strip(), count.strip())
+
+    @pydantic.field_validator("shard")
+    @classmethod
+    def ensure_shard(cls, value: tuple[int, int] | None) -> tuple[int, int] | None:
+        """Pydantic validator to ensure a shard is within its number of shards."""
+        if value and not 1 <= value[0] <= value[1]:
+            raise ValueError(f"shard {value[0]} must be between 1 and {value[1]}")
+        return value
+
+    @pydantic.field_validator("templates", "pages", "static", "base", "output", "cache")
     @classmethod
     def ensure_directory(cls, path: pathlib.Path | None) -> pathlib.Path | None:
         """Pydantic validator to ensure the specified path is a directory."""
@@ -71,6 +172,15 @@ class SiteGeneratorConfig(BaseSettings):
 
         return path
 
+    @pydantic.field_validator("trace", "socket")
+    @classmethod
+    def ensure_absolute(cls, path: pathlib.Path | None) -> pathlib.Path | None:
+        """
+        Pydantic validator to ensure a file path is absolute, so it refers to the same
+        file when the config is sent to the daemon.
+        """
+        return path.absolute() if path else None
+
     def format_relative_path(self, path: pathlib.Path | str | bytes) -> str:
         """
         Call `path.relative_to(SiteGeneratorConfig.base)` and return the result.
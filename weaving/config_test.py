@@ -19,6 +19,8 @@ def fake_test_config(**kwargs: Any) -> config.SiteGeneratorConfig:
         kwargs["output"] = pathlib.Path("./output")
     if "command" not in kwargs:
         kwargs["command"] = "build"
+    if "jobs" not in kwargs:
+        kwargs["jobs"] = 1
     return config.SiteGeneratorConfig(**kwargs)
 
 
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging as std_logging
+import socket
+import threading
+from typing import TYPE_CHECKING, Any
+
+from weaving import config, errors, logging
+
+# Only the daemon itself needs the modules that do the work, so they are imported when
+# it starts rather than by every CLI command that connects to it.
+
+if TYPE_CHECKING:
+    import pathlib
+    from collections.abc import Awaitable, Callable, Iterator
+
+LOGGER = logging.getLogger()
+
+COMMANDS = {"build", "validate"}
+"""The CLI commands that are run by the daemon when one is running."""
+
+
+class Daemon:
+    """
+    A long-running process that runs `build` and `validate` commands sent to it by the
+    CLI over a local Unix socket.
+
+    Renderers, Markdown engines, Jinja environments and compiled templates are kept
+    between commands, so repeated builds skip the start-up costs of a fresh process.
+    Commands are run one at a time, in the order they are received.
+    """
+
+    def __init__(
+        self,
+        cfg: config.SiteGeneratorConfig,
+        run: Callable[[config.SiteGeneratorConfig], Awaitable[int]],
+    ) -> None:
+        if not cfg.socket:
+            raise errors.WeavingError("Cannot start daemon without a socket path")
+
+        self.cfg = cfg
+        self.path: pathlib.Path = cfg.socket
+        self._run = run
+        self._lock = asyncio.Lock()
+        self.listening = asyncio.Event()
+
+    async def serve(self) -> None:
+        """Listen for commands until the daemon is interrupted."""
+        if streams := await _connect(self.path):
+            await _close(streams[1])
+            raise errors.WeavingError(
+                "A daemon is already listening at "
+                f"{self.cfg.format_relative_path(self.path)}"
+            )
+        self.path.unlink(missing_ok=True)
+
+        from weaving import workers  # noqa: PLC0415
+
+        _warm(self.cfg)
+        with workers.keep_warm():
+            server = await asyncio.start_unix_server(self._handle, self.path)
+            self.listening.set()
+            LOGGER.info(
+                "Daemon listening for commands at "
+                f"{self.cfg.format_relative_path(self.path)}"
+            )
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                self.path.unlink(missing_ok=True)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Run a single command, streaming its log records back to the client followed by
+        its exit code.
+        """
+        try:
+            request = json.loads(await reader.readline())
+            cfg = config.SiteGeneratorConfig.model_validate(request["config"])
+        except Exception:
+            LOGGER.exception("Invalid daemon request")
+            _send(writer, {"exit": 1})
+            await _close(writer)
+            return
+
+        async with self._lock:
+            LOGGER.info(f"Running {cfg.command} command")
+            with _forward_logs(cfg, writer):
+                code = await self._run(cfg)
+            _send(writer, {"exit": code})
+            await _close(writer)
+
+
+def _warm(cfg: config.SiteGeneratorConfig) -> None:
+    """Load everything a build needs up-front, so the first command is fast too."""
+    from weaving import markdown, pipeline, template, validation  # noqa: F401, PLC0415
+
+    markdown.get_engine()
+    markdown.get_render_fingerprint()
+
+    template.jinja(cfg.templates, cfg.cache).compile_templates()
+
+
+class _ForwardHandler(std_logging.Handler):
+    """
+    Logging handler that sends records to a daemon client.
+
+    Records logged on other threads, like those rendering templates in-process, are
+    sent from the event loop the handler was created on, as asyncio streams aren't
+    thread-safe.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        super().__init__()
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.thread = threading.get_ident()
+        self.setFormatter(std_logging.Formatter("%(message)s"))
+
+    def emit(self, record: std_logging.LogRecord) -> None:
+        with contextlib.suppress(Exception):
+            message = {"level": record.levelno, "message": self.format(record)}
+            if threading.get_ident() == self.thread:
+                _send(self.writer, message)
+            else:
+                self.loop.call_soon_threadsafe(_send, self.writer, message)
+
+
+@contextlib.contextmanager
+def _forward_logs(
+    cfg: config.SiteGeneratorConfig, writer: asyncio.StreamWriter
+) -> Iterator[None]:
+    app = logging.getLogger()
+    level = app.level
+    handler = _ForwardHandler(writer)
+
+    app.setLevel(std_logging.DEBUG if cfg.verbose else std_logging.INFO)
+    app.addHandler(handler)
+    try:
+        yield
+    finally:
+        app.removeHandler(handler)
+        app.setLevel(level)
+
+
+def _send(writer: asyncio.StreamWriter, message: dict[str, Any]) -> None:
+    if not writer.is_closing():
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+
+
+async def _close(writer: asyncio.StreamWriter) -> None:
+    with contextlib.suppress(ConnectionError):
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+
+async def _connect(
+    path: pathlib.Path,
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter] | None:
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    try:
+        return await asyncio.open_unix_connection(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return None
+
+
+async def request(cfg: config.SiteGeneratorConfig) -> int | None:
+    """
+    Run a command on the daemon listening at `cfg.socket`, logging its log records
+    locally and returning its exit code.
+
+    Returns `None` without running the command if no daemon is running, so the command
+    can be run in-process instead.
+    """
+    if not cfg.socket or cfg.command not in COMMANDS:
+        return None
+    if not (streams := await _connect(cfg.socket)):
+        return None
+
+    reader, writer = streams
+    LOGGER.debug(f"Running {cfg.command} command on daemon")
+    try:
+        _send(writer, {"config": cfg.model_dump(mode="json")})
+        await writer.drain()
+
+        async for line in reader:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            LOGGER.log(message["level"], message["message"])
+    finally:
+        await _close(writer)
+
+    raise errors.WeavingError("Daemon closed the connection before the command ended")
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import logging as std_logging
+import pathlib
+import threading
+
+import pytest
+
+from weaving import config, config_test, daemon, logging
+
+LOGGER = logging.getLogger()
+
+
+def test_request__no_daemon(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(socket=tmp_path / "daemon.sock")
+    assert asyncio.run(daemon.request(cfg)) is None
+
+    # Stale sockets left by a daemon that didn't exit cleanly are ignored
+    (tmp_path / "daemon.sock").touch()
+    assert asyncio.run(daemon.request(cfg)) is None
+
+
+def test_daemon(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cfg = config_test.fake_test_config(socket=tmp_path / "daemon.sock")
+    commands: list[str] = []
+
+    # Streams are only ever written to from the event loop's thread
+    writers: set[threading.Thread] = set()
+    write = asyncio.StreamWriter.write
+
+    def write_from(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writers.add(threading.current_thread())
+        write(writer, data)
+
+    monkeypatch.setattr(asyncio.StreamWriter, "write", write_from)
+
+    async def run_command(cfg: config.SiteGeneratorConfig) -> int:
+        commands.append(cfg.command)
+        LOGGER.warning("hello from the daemon")
+        await asyncio.to_thread(LOGGER.warning, "hello from a thread")
+        return 3
+
+    async def run() -> list[dict[str, object]]:
+        instance = daemon.Daemon(cfg, run_command)
+        server = asyncio.create_task(instance.serve())
+        await instance.listening.wait()
+
+        reader, writer = await asyncio.open_unix_connection(tmp_path / "daemon.sock")
+        request = cfg.model_copy(update={"command": "validate"})
+        writer.write(json.dumps({"config": request.model_dump(mode="json")}).encode())
+        writer.write(b"\n")
+        messages = [json.loads(line) async for line in reader]
+        writer.close()
+
+        server.cancel()
+        return messages
+
+    assert asyncio.run(run()) == [
+        {"level": std_logging.WARNING, "message": "hello from the daemon"},
+        {"level": std_logging.WARNING, "message": "hello from a thread"},
+        {"exit": 3},
+    ]
+    assert commands == ["validate"]
+    assert writers == {threading.main_thread()}
+    assert not (tmp_path / "daemon.sock").exists()
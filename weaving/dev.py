@@ -8,7 +8,7 @@ from collections.abc import Callable, Coroutine
 
 import watchfiles
 
-from weaving import config, logging, pipeline
+from weaving import config, discovery, logging, pipeline
 
 LOGGER = logging.getLogger()
 
@@ -21,8 +21,22 @@ async def watch_and_serve(cfg: config.SiteGeneratorConfig) -> None:
 async def _watch_site_files(cfg: config.SiteGeneratorConfig) -> None:
     paths = [cfg.templates, cfg.pages, cfg.static]
     LOGGER.debug(f"Watching {paths} for site changes")
+
+    # Changes to ignored files, like editor swap files, don't need a rebuild
+    ignore = discovery.IgnoreRules.from_config(cfg)
+    default_filter = watchfiles.DefaultFilter()
+
+    def watch_filter(change: watchfiles.Change, path: str) -> bool:
+        parts = [pathlib.Path(path), *pathlib.Path(path).parents]
+        return default_filter(change, path) and not any(
+            ignore.is_ignored(part) for part in parts
+        )
+
     await watchfiles.arun_process(
-        *paths, target=_run_process_callback, args=(pipeline.pipeline, cfg)
+        *paths,
+        target=_run_process_callback,
+        args=(pipeline.pipeline, cfg),
+        watch_filter=watch_filter,
     )
 
 
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import fnmatch
+import os
+import re
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pathlib
+    from collections.abc import AsyncIterator, Iterable, Iterator
+
+    from weaving import config
+
+DEFAULT_IGNORE = ["*~", "*.swp", "*.swo", ".#*", "#*#", ".DS_Store", "Thumbs.db"]
+"""Patterns for the temporary and metadata files of editors and file browsers."""
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Entry:
+    """A source file found by `find_files`."""
+
+    path: pathlib.Path
+    """The absolute path to the file."""
+
+    stat: os.stat_result
+    """The result of `os.stat` for the file when it was found."""
+
+
+class IgnoreRules:
+    """
+    Patterns for files and directories to leave out of a build, in the style of a
+    `.gitignore` file.
+
+    A pattern without a `/` matches the name of a file or directory at any depth, like
+    `*.swp`. A pattern with a `/` matches a path relative to the `base` directory, like
+    `static/img/README.md`. Files under an ignored directory are ignored too.
+    """
+
+    def __init__(
+        self, patterns: Iterable[str], base: pathlib.Path | None = None
+    ) -> None:
+        self.base = base
+
+        names: list[str] = []
+        paths: list[str] = []
+        for pattern in patterns:
+            if "/" in pattern.rstrip("/"):
+                paths.append(fnmatch.translate(pattern.strip("/")))
+            else:
+                names.append(fnmatch.translate(pattern.rstrip("/")))
+
+        self._names = re.compile("|".join(names)) if names else None
+        self._paths = re.compile("|".join(paths)) if paths and base else None
+
+    @classmethod
+    def from_config(cls, cfg: config.SiteGeneratorConfig) -> IgnoreRules:
+        """Create the rules for `DEFAULT_IGNORE` and the `cfg.ignore` patterns."""
+        return cls([*DEFAULT_IGNORE, *cfg.ignore], cfg.base)
+
+    def is_ignored(self, path: pathlib.Path) -> bool:
+        """Check if a file or directory at the absolute `path` is ignored."""
+        if self._names and self._names.match(path.name):
+            return True
+        if self._paths and self.base and path.is_relative_to(self.base):
+            return bool(self._paths.match(path.relative_to(self.base).as_posix()))
+        return False
+
+
+async def find_files(
+    root: pathlib.Path, *, suffix: str = "", ignore: IgnoreRules | None = None
+) -> AsyncIterator[Entry]:
+    """
+    Find every file under `root` whose name ends with `suffix`, skipping any files and
+    directories matched by `ignore`.
+
+    The directory tree is walked with `os.scandir` on a worker thread, so the event loop
+    is never blocked, and files are yielded a directory at a time as they are found.
+    Each file is stat-ed once, and the result is kept in its `Entry` for later stages.
+    """
+    loop = asyncio.get_running_loop()
+    batches: asyncio.Queue[list[Entry] | BaseException | None] = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item: list[Entry] | BaseException | None) -> None:
+        # The loop may already be closed if the consumer stopped iterating early
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(batches.put_nowait, item)
+
+    def walk() -> None:
+        try:
+            for batch in _walk(root, suffix, ignore, stop):
+                put(batch)
+        except Exception as ex:
+            put(ex)
+        else:
+            put(None)
+
+    walker = asyncio.ensure_future(asyncio.to_thread(walk))
+    try:
+        while (batch := await batches.get()) is not None:
+            if isinstance(batch, BaseException):
+                raise batch
+            for entry in batch:
+                yield entry
+    finally:
+        stop.set()
+        await walker
+
+
+def _walk(
+    root: pathlib.Path,
+    suffix: str,
+    ignore: IgnoreRules | None,
+    stop: threading.Event,
+) -> Iterator[list[Entry]]:
+    """Walk the tree under `root` top-down, yielding the files of each directory."""
+    directories = [root]
+    while directories and not stop.is_set():
+        directory = directories.pop()
+        files: list[Entry] = []
+        subdirectories: list[pathlib.Path] = []
+        try:
+            with os.scandir(directory) as it:
+                dir_entries = list(it)
+        except OSError:
+            continue  # Like `os.walk`, directories that can't be read are skipped
+
+        for dir_entry in dir_entries:
+            path = directory / dir_entry.name
+            if ignore and ignore.is_ignored(path):
+                continue
+            if dir_entry.is_dir(follow_symlinks=False):
+                subdirectories.append(path)
+            elif dir_entry.name.endswith(suffix) and dir_entry.is_file():
+                files.append(Entry(path, dir_entry.stat()))
+
+        if files:
+            yield files
+        directories.extend(reversed(subdirectories))
@@ -0,0 +1,57 @@
+import asyncio
+import pathlib
+
+from weaving import discovery
+
+
+def _find(
+    root: pathlib.Path, suffix: str = "", ignore: discovery.IgnoreRules | None = None
+) -> list[str]:
+    async def run() -> list[str]:
+        return [
+            entry.path.relative_to(root).as_posix()
+            async for entry in discovery.find_files(root, suffix=suffix, ignore=ignore)
+        ]
+
+    return sorted(asyncio.run(run()))
+
+
+def test_find_files(tmp_path: pathlib.Path) -> None:
+    for name in [
+        "index.md",
+        "image.png",
+        ".index.md.swp",
+        "blog/post.md",
+        "blog/post.md~",
+        "img/README.md",
+        "drafts/draft.md",
+    ]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+
+    ignore = discovery.IgnoreRules(
+        [*discovery.DEFAULT_IGNORE, "drafts", "img/README.md"], tmp_path
+    )
+    assert _find(tmp_path, suffix=".md", ignore=ignore) == ["blog/post.md", "index.md"]
+    assert _find(tmp_path, ignore=ignore) == ["blog/post.md", "image.png", "index.md"]
+    assert len(_find(tmp_path)) == len(list(tmp_path.rglob("*.*")))
+
+
+def test_find_files__stat(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "index.md").write_text("hello")
+
+    async def run() -> list[discovery.Entry]:
+        return [entry async for entry in discovery.find_files(tmp_path)]
+
+    [entry] = asyncio.run(run())
+    assert entry.stat.st_size == len("hello")
+    assert entry.stat.st_mtime_ns == (tmp_path / "index.md").stat().st_mtime_ns
+
+
+def test_find_files__symlink_cycle(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "page.md").write_text("page")
+    (tmp_path / "a" / "loop").symlink_to("..", target_is_directory=True)
+
+    # Like `os.walk`, symlinked directories aren't followed
+    assert _find(tmp_path, suffix=".md") == ["a/page.md"]
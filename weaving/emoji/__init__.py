@@ -1,4 +1,5 @@
-from .db import EMOJI
+from typing import Any
+
 from .emoji import replace_emoji, to_markdown_db, to_unicode_emoji
 
 __all__ = [
@@ -7,3 +8,12 @@ __all__ = [
     "to_markdown_db",
     "to_unicode_emoji",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # Load the emoji DB lazily, see `emoji._db`
+    if name == "EMOJI":
+        from .db import EMOJI  # noqa: PLC0415
+
+        return EMOJI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,23 @@
-import contextlib
-from typing import Any
+import functools
+import re
+from collections.abc import Iterator, Mapping
+from typing import Any, override
 
-from .db import EMOJI
+# Shortnames are only replaced when they make up an entire space delimited word
+_SHORTNAME_RE = re.compile(r"(?<![^ ]):([^ ]*):(?![^ ])")
+
+
+@functools.cache
+def _db() -> dict[str, str]:
+    """
+    Load the emoji DB on first use.
+
+    The DB has thousands of entries, so it is only imported once something actually
+    needs to look up an emoji.
+    """
+    from .db import EMOJI  # noqa: PLC0415
+
+    return EMOJI
 
 
 def to_unicode_emoji(
@@ -23,26 +39,47 @@ def to_unicode_emoji(
     del index, alias, uc, alt, title, category, options, md
     shortname = shortname.removeprefix(":")
     shortname = shortname.removesuffix(":")
-    return EMOJI[shortname]
+    return _db()[shortname]
+
+
+class _MarkdownEmojiEntries(Mapping[str, dict[str, str]]):
+    """
+    Read-only view of the emoji DB with the `":shortname:"` keys and entry structure
+    `pymdownx.emoji` expects.
+
+    Entries are created as they are looked up, so there's no up-front cost to building
+    the index for the entire DB.
+    """
 
+    @override
+    def __getitem__(self, key: str) -> dict[str, str]:
+        name = key.removeprefix(":").removesuffix(":")
+        if key != f":{name}:" or name not in _db():
+            raise KeyError(key)
+        return {"category": "", "name": name, "unicode": "0"}
 
-def to_markdown_db(
-    options: Any, md: Any
-) -> dict[str, str | dict[str, str | dict[str, str]]]:
-    """Return the Unicode emoji DB in the structure required for markdown conversion."""
+    @override
+    def __iter__(self) -> Iterator[str]:
+        return (f":{name}:" for name in _db())
+
+    @override
+    def __len__(self) -> int:
+        return len(_db())
+
+
+@functools.cache
+def _markdown_db() -> dict[str, Any]:
+    return {"name": "unicode", "emoji": _MarkdownEmojiEntries(), "aliases": {}}
+
+
+def to_markdown_db(options: Any, md: Any) -> dict[str, Any]:
+    """
+    Return the Unicode emoji DB in the structure required for markdown conversion.
+
+    The index is created once per process and shared by every Markdown instance.
+    """
     del options, md
-    return {
-        "name": "unicode",
-        "emoji": {
-            f":{k}:": {
-                "category": "",
-                "name": k,
-                "unicode": "0",
-            }
-            for k, v in EMOJI.items()
-        },
-        "aliases": {},
-    }
+    return _markdown_db()
 
 
 def replace_emoji(content: str | None) -> str | None:
@@ -57,13 +94,4 @@ def replace_emoji(content: str | None) -> str | None:
     if not content:
         return content
 
-    words = []
-    for word in content.split(" "):
-        emoji = None
-        if word.startswith(":") and word.endswith(":"):
-            with contextlib.suppress(KeyError):
-                emoji = to_unicode_emoji(shortname=word)
-
-        words.append(emoji or word)
-
-    return " ".join(words)
+    return _SHORTNAME_RE.sub(lambda m: _db().get(m.group(1), m.group(0)), content)
@@ -15,7 +15,21 @@ from weaving.emoji import emoji
         ("Hello :scream_cat there", "Hello :scream_cat there"),
         ("Hello :scream cat: there", "Hello :scream cat: there"),
         (":not_an_emoji:", ":not_an_emoji:"),
+        (":wave: :wave:", "👋 👋"),
+        (":wave::wave:", ":wave::wave:"),
+        ("Hello :wave:!", "Hello :wave:!"),
+        ("::", "::"),
     ],
 )
 def test_replace_emoji(test: str, expected: str) -> None:
     assert emoji.replace_emoji(test) == expected
+
+
+def test_to_markdown_db() -> None:
+    db = emoji.to_markdown_db(None, None)
+    assert db is emoji.to_markdown_db(None, None)
+
+    assert db["emoji"][":wave:"] == {"category": "", "name": "wave", "unicode": "0"}
+    assert db["emoji"].get("wave") is None
+    assert db["emoji"].get(":not_an_emoji:") is None
+    assert ":wave:" in db["emoji"]
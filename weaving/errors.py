@@ -15,6 +15,10 @@ class PipelineError(WeavingError):
     """Pipeline failure for a specific source file."""
 
 
+class MergeError(WeavingError):
+    """Missing or conflicting shard outputs when merging a sharded build."""
+
+
 class ValidationError(pydantic.BaseModel):
     """Site validation errors generated by the `validate` CLI command."""
 
@@ -13,6 +13,8 @@ _WHITESPACE_RE = re.compile(r"\s+")
 
 PageType = Literal["default", "blog", "blog_index"]
 
+MarkdownProfile = Literal["auto", "full"]
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -98,6 +100,15 @@ class PageFrontmatter(pydantic.BaseModel):
     debug: bool = False
     """Mark this page for local preview only, not included in the regular build."""
 
+    markdown: MarkdownProfile = "auto"
+    """
+    The Markdown extensions to render this page's content with.
+
+    - `auto` is the default value, and renders the page with only the extensions for
+      the Markdown constructs found in it, which is faster for simple pages.
+    - `full` always renders the page with every extension.
+    """
+
     # The following fields are populated automatically, don't need to be in the
     # template frontmatter, and aren't included in template rendering.
     file: pathlib.Path
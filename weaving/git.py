@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+from typing import TYPE_CHECKING
+
+from weaving import config, logging
+
+if TYPE_CHECKING:
+    import os
+    import pathlib
+
+LOGGER = logging.getLogger()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class GitIndex:
+    """
+    Git metadata for a build, collected once up front so rendering a page never needs
+    to spawn a `git` process.
+    """
+
+    sha: str | None = None
+    """The SHA of the current HEAD commit, if the site is in a git repository."""
+
+    committed_at: dict[pathlib.Path, datetime.datetime] = dataclasses.field(
+        default_factory=dict
+    )
+    """The time of the most recent commit to touch each file, keyed by absolute path."""
+
+    def get_modified_at(
+        self, path: pathlib.Path, stat: os.stat_result | None = None
+    ) -> datetime.datetime:
+        """
+        Get the date and time a file was last modified.
+
+        This is the time of the most recent commit to touch the file, as filesystem
+        modification times are reset by every fresh checkout. Files that have never
+        been committed fall back to their filesystem modification time, from `stat` if
+        the file was already stat-ed.
+        """
+        if committed_at := self.committed_at.get(path.absolute()):
+            return committed_at
+        stat = stat or path.stat()
+        return datetime.datetime.fromtimestamp(stat.st_mtime, datetime.UTC)
+
+
+async def load_index(cfg: config.SiteGeneratorConfig) -> GitIndex:
+    """
+    Build the `GitIndex` for a site build.
+
+    The HEAD SHA is read directly from the repository files, and the commit times of
+    every page are collected from a single `git log` run over the pages directory. If
+    the site isn't in a git repository an empty index is returned.
+    """
+    git_dir = find_git_dir(cfg.base)
+    if not git_dir:
+        LOGGER.debug(f"{cfg.format_relative_path(cfg.base)} is not in a git repository")
+        return GitIndex()
+
+    return GitIndex(
+        sha=read_head_sha(git_dir),
+        committed_at=await _read_commit_times(git_dir.parent, cfg.pages),
+    )
+
+
+def find_git_dir(path: pathlib.Path) -> pathlib.Path | None:
+    """
+    Find the `.git` entry of the repository containing `path`.
+
+    This is the `.git` directory for regular repositories, or the `.git` file pointing
+    to the real git directory for linked worktrees and submodules.
+    """
+    for parent in [path.absolute(), *path.absolute().parents]:
+        if (parent / ".git").exists():
+            return parent / ".git"
+    return None
+
+
+def read_head_sha(git_dir: pathlib.Path) -> str | None:
+    """
+    Read the SHA of the HEAD commit without running `git`.
+
+    Follows symbolic refs from `HEAD` through loose ref files and `packed-refs`, and
+    returns `None` if HEAD can't be resolved (like in a freshly initialised repository).
+    """
+    git_dir = _resolve_git_dir(git_dir)
+    common_dir = git_dir
+    if (commondir := git_dir / "commondir").is_file():
+        common_dir = (git_dir / commondir.read_text().strip()).resolve()
+
+    ref = "HEAD"
+    for _ in range(10):  # Guard against symbolic ref loops
+        value = _read_ref(git_dir, common_dir, ref)
+        if value is None:
+            return None
+        if not value.startswith("ref:"):
+            return value
+        ref = value.removeprefix("ref:").strip()
+
+    LOGGER.debug(f"Unable to resolve HEAD in {git_dir}, too many symbolic refs")
+    return None
+
+
+def _resolve_git_dir(git_dir: pathlib.Path) -> pathlib.Path:
+    # Worktrees and submodules have a `.git` file pointing at the real git directory
+    if git_dir.is_file():
+        target = git_dir.read_text().strip().removeprefix("gitdir:").strip()
+        return (git_dir.parent / target).resolve()
+    return git_dir
+
+
+def _read_ref(git_dir: pathlib.Path, common_dir: pathlib.Path, ref: str) -> str | None:
+    # Per-worktree refs live in the git dir, everything else in the common dir
+    for base in [git_dir, common_dir]:
+        if (path := base / ref).is_file():
+            return path.read_text().strip()
+
+    packed = common_dir / "packed-refs"
+    if packed.is_file():
+        for line in packed.read_text().splitlines():
+            if line.startswith(("#", "^")):
+                continue
+            sha, _, name = line.partition(" ")
+            if name == ref:
+                return sha
+    return None
+
+
+async def _read_commit_times(
+    root: pathlib.Path, path: pathlib.Path
+) -> dict[pathlib.Path, datetime.datetime]:
+    """
+    Collect the time of the most recent commit to touch each file under `path` from a
+    single `git log` run.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "git",
+            "log",
+            "-z",
+            "--name-only",
+            "--no-renames",
+            "--format=%x01%ct",
+            "--",
+            str(path),
+            cwd=root,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate()
+    except OSError as ex:
+        LOGGER.debug(f"Unable to run git to collect commit times: {ex}")
+        return {}
+
+    if proc.returncode != 0:
+        LOGGER.debug(f"Unable to collect commit times: {stderr.decode().strip()}")
+        return {}
+
+    # Output is a sequence of `\x01{timestamp}` markers, each followed by the NUL
+    # separated names of the files changed in that commit, newest commit first.
+    committed_at: dict[pathlib.Path, datetime.datetime] = {}
+    timestamp = None
+    for token in stdout.decode("utf-8").split("\0"):
+        token = token.strip("\n")  # noqa: PLW2901
+        if token.startswith("\x01"):
+            timestamp = datetime.datetime.fromtimestamp(int(token[1:]), datetime.UTC)
+        elif token and timestamp:
+            committed_at.setdefault(root / token, timestamp)
+
+    return committed_at
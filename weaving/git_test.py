@@ -0,0 +1,112 @@
+import asyncio
+import datetime as dt
+import os
+import pathlib
+import shutil
+import subprocess
+
+import pytest
+
+from weaving import config_test, git
+
+SHA_1 = "1" * 40
+SHA_2 = "2" * 40
+
+
+@pytest.fixture
+def git_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / ".git"
+    (path / "refs" / "heads").mkdir(parents=True)
+    (path / "HEAD").write_text("ref: refs/heads/main\n")
+    return path
+
+
+def test_read_head_sha__loose_ref(git_dir: pathlib.Path) -> None:
+    (git_dir / "refs" / "heads" / "main").write_text(f"{SHA_1}\n")
+    assert git.read_head_sha(git_dir) == SHA_1
+
+
+def test_read_head_sha__packed_ref(git_dir: pathlib.Path) -> None:
+    (git_dir / "packed-refs").write_text(
+        "# pack-refs with: peeled fully-peeled sorted\n"
+        f"{SHA_2} refs/heads/other\n"
+        f"{SHA_1} refs/heads/main\n"
+        f"^{SHA_2}\n"
+    )
+    assert git.read_head_sha(git_dir) == SHA_1
+
+
+def test_read_head_sha__detached(git_dir: pathlib.Path) -> None:
+    (git_dir / "HEAD").write_text(f"{SHA_2}\n")
+    assert git.read_head_sha(git_dir) == SHA_2
+
+
+def test_read_head_sha__unborn(git_dir: pathlib.Path) -> None:
+    assert git.read_head_sha(git_dir) is None
+
+
+def test_read_head_sha__worktree(git_dir: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    (git_dir / "refs" / "heads" / "main").write_text(f"{SHA_1}\n")
+    (git_dir / "refs" / "heads" / "feature").write_text(f"{SHA_2}\n")
+
+    worktree_git_dir = git_dir / "worktrees" / "feature"
+    worktree_git_dir.mkdir(parents=True)
+    (worktree_git_dir / "HEAD").write_text("ref: refs/heads/feature\n")
+    (worktree_git_dir / "commondir").write_text("../..\n")
+
+    worktree = tmp_path / "feature"
+    worktree.mkdir()
+    (worktree / ".git").write_text(f"gitdir: {worktree_git_dir}\n")
+
+    assert git.find_git_dir(worktree / "pages") == worktree / ".git"
+    assert git.read_head_sha(worktree / ".git") == SHA_2
+
+
+def _git(repo: pathlib.Path, *args: str, timestamp: int = 0) -> None:
+    date = f"@{timestamp} +0000"
+    user = ["-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run(  # noqa: S603
+        ["git", *user, *args],  # noqa: S607
+        cwd=repo,
+        env={**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+        check=True,
+    )
+
+
+def _commit(repo: pathlib.Path, timestamp: int) -> None:
+    _git(repo, "add", "--all")
+    _git(repo, "commit", "--quiet", "--message", "test", timestamp=timestamp)
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git is not installed")
+def test_load_index__commit_times(tmp_path: pathlib.Path) -> None:
+    pages = tmp_path / "pages"
+    (pages / "blog").mkdir(parents=True)
+    _git(tmp_path, "init", "--quiet")
+
+    for name in ["index.md", "blog/post.md", "with space.md", "old.md", "gone.md"]:
+        (pages / name).write_text(name)
+    (tmp_path / "README.md").write_text("not a page")
+    _commit(tmp_path, 1_700_000_000)
+
+    (pages / "index.md").write_text("changed")
+    (pages / "old.md").rename(pages / "new.md")
+    (pages / "gone.md").unlink()
+    (tmp_path / "README.md").write_text("still not a page")
+    _commit(tmp_path, 1_700_000_100)
+
+    cfg = config_test.fake_test_config(base=tmp_path, pages=pages)
+    index = asyncio.run(git.load_index(cfg))
+    assert index.sha == git.read_head_sha(tmp_path / ".git")
+
+    first = dt.datetime.fromtimestamp(1_700_000_000, dt.UTC)
+    second = dt.datetime.fromtimestamp(1_700_000_100, dt.UTC)
+    assert index.committed_at == {
+        pages / "index.md": second,
+        pages / "blog" / "post.md": first,
+        pages / "with space.md": first,
+        # Renames are a deletion of the old name and an addition of the new name
+        pages / "old.md": second,
+        pages / "new.md": second,
+        pages / "gone.md": second,
+    }
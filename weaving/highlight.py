@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import pathlib
+import types
+from importlib import metadata
+from typing import TYPE_CHECKING, Any, cast, override
+
+import markdown
+import pygments
+import pygments.formatters
+import pygments.lexers
+import pygments.modeline
+import pygments.plugin
+import pygments.util
+from markdown.extensions import codehilite, fenced_code
+
+from weaving import cache
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pygments.formatter import Formatter
+    from pygments.lexer import Lexer
+
+    from weaving import config
+
+MEMORY_CACHE_SIZE = 1024
+"""The number of highlighted code blocks kept in memory by each process."""
+
+_memory: cache.MemoryCache[str, str] = cache.MemoryCache(MEMORY_CACHE_SIZE)
+_disk: cache.DiskCache | None = None
+
+
+class CachedCodeHilite(codehilite.CodeHilite):
+    """
+    A `codehilite.CodeHilite` that caches the highlighted HTML of each code block.
+
+    Highlighted code is cached by its language, highlighting options, and a hash of the
+    code itself, in memory and in the persistent build cache when there is one, so a
+    code block is only highlighted once however many pages or builds it appears in.
+
+    Lexers and formatters are looked up in a registry resolved once per process, rather
+    than by Pygments' scans of every lexer and installed plugin on each lookup.
+    """
+
+    if TYPE_CHECKING:
+        # Parses a language and highlighted lines from the code's first line, which
+        # isn't in the type stubs for CodeHilite
+        def _parseHeader(self) -> None: ...
+
+    @override
+    def hilite(self, shebang: bool = True) -> str:
+        if not (codehilite.pygments and self.use_pygments):
+            return super().hilite(shebang)
+
+        key = self._get_cache_key(shebang=shebang)
+        if (html := _memory.get(key)) is not None:
+            return html
+        if _disk and (html := _disk.get_text(key)) is not None:
+            _memory.set(key, html)
+            return html
+
+        html = self._highlight(shebang=shebang)
+        _memory.set(key, html)
+        if _disk:
+            _disk.set_text(key, html)
+        return html
+
+    def _get_cache_key(self, *, shebang: bool) -> str:
+        if isinstance(self.pygments_formatter, str):
+            formatter = self.pygments_formatter
+        else:
+            formatter = f"{self.pygments_formatter.__module__}."
+            formatter += self.pygments_formatter.__qualname__
+
+        digest = hashlib.sha256(get_fingerprint().encode())
+        for value in [
+            self.lang,
+            self.guess_lang,
+            self.lang_prefix,
+            formatter,
+            sorted(self.options.items()),
+            shebang,
+        ]:
+            digest.update(f"{value!r}\0".encode())
+        digest.update(self.src.encode())
+        return digest.hexdigest()
+
+    def _highlight(self, *, shebang: bool) -> str:
+        """Highlight the code like `codehilite.CodeHilite.hilite` does with Pygments."""
+        self.src = self.src.strip("\n")
+
+        if self.lang is None and shebang:
+            self._parseHeader()
+
+        try:
+            lexer = get_lexer(self.lang, self.options)
+        except pygments.util.ClassNotFound:
+            try:
+                if self.guess_lang:
+                    lexer = guess_lexer(self.src, self.options)
+                else:
+                    lexer = get_lexer("text", self.options)
+            except pygments.util.ClassNotFound:
+                lexer = get_lexer("text", self.options)
+        if not self.lang:
+            # Use the guessed lexer's language instead
+            self.lang = lexer.aliases[0]
+
+        formatter: Formatter[str]
+        if isinstance(self.pygments_formatter, str):
+            try:
+                formatter = get_formatter(self.pygments_formatter, self.options)
+            except pygments.util.ClassNotFound:
+                formatter = get_formatter("html", self.options)
+        else:
+            formatter = self.pygments_formatter(
+                lang_str=f"{self.lang_prefix}{self.lang}", **self.options
+            )
+        return pygments.highlight(self.src, lexer, formatter)
+
+
+class CachedHighlight(markdown.Extension):
+    """
+    Highlight code blocks with `CachedCodeHilite` in the `codehilite` and `fenced_code`
+    Markdown extensions, without changing those extensions for any other converter.
+
+    Must be registered after the extensions it applies to, which it swaps the
+    highlighting processors of for copies that use `CachedCodeHilite`.
+    """
+
+    @override
+    def extendMarkdown(self, md: markdown.Markdown) -> None:
+        md.registerExtension(self)
+        # Registered under the same names and priorities, replacing the originals
+        for ext in md.registeredExtensions:
+            if isinstance(ext, codehilite.CodeHiliteExtension):
+                hiliter = _HiliteTreeprocessor(md)
+                hiliter.config = ext.getConfigs()
+                md.treeprocessors.register(hiliter, "hilite", 30)
+            elif isinstance(ext, fenced_code.FencedCodeExtension):
+                md.preprocessors.register(
+                    _FencedBlockPreprocessor(md, ext.getConfigs()),
+                    "fenced_code_block",
+                    25,
+                )
+
+
+def _with_cached_hilite[F: Callable[..., Any]](func: F) -> F:
+    """
+    Copy a function that highlights code with its module's `CodeHilite`, so the copy
+    highlights it with `CachedCodeHilite` instead, leaving the module itself unchanged.
+
+    The functions copied are internal to Markdown, which is pinned to the versions they
+    are known to work with, and a function that no longer uses `CodeHilite` is an error
+    rather than silently going uncached.
+    """
+    if "CodeHilite" not in func.__code__.co_names:
+        raise RuntimeError(f"{func.__qualname__} does not highlight with CodeHilite")
+
+    copy = types.FunctionType(
+        func.__code__,
+        {**func.__globals__, "CodeHilite": CachedCodeHilite},
+        func.__name__,
+        func.__defaults__,
+        func.__closure__,
+    )
+    copy.__kwdefaults__ = func.__kwdefaults__
+    return cast("F", functools.update_wrapper(copy, func))
+
+
+class _HiliteTreeprocessor(codehilite.HiliteTreeprocessor):
+    run = _with_cached_hilite(codehilite.HiliteTreeprocessor.run)
+
+
+class _FencedBlockPreprocessor(fenced_code.FencedBlockPreprocessor):
+    run = _with_cached_hilite(fenced_code.FencedBlockPreprocessor.run)
+
+
+def configure(cfg: config.SiteGeneratorConfig) -> None:
+    """Set up the highlighting cache for `cfg`, and resolve the Pygments registry."""
+    global _disk  # noqa: PLW0603
+    _disk = cache.DiskCache(cfg.cache / "highlight") if cfg.cache else None
+    _get_lexer_classes()
+    _get_formatter_classes()
+
+
+def clear() -> None:
+    """Discard every highlighted code block cached in memory."""
+    _memory.clear()
+
+
+def get_lexer(alias: str | None, options: dict[str, Any]) -> Lexer:
+    """Get a lexer by one of its aliases, like `pygments.lexers.get_lexer_by_name`."""
+    if not alias or not (cls := _find_lexer_class(alias.lower())):
+        raise pygments.util.ClassNotFound(f"no lexer for alias {alias!r} found")
+    return cls(**options)
+
+
+def guess_lexer(src: str, options: dict[str, Any]) -> Lexer:
+    """
+    Guess the lexer for `src`, like `pygments.lexers.guess_lexer`, from the lexer
+    classes resolved once for the process.
+    """
+    if (filetype := pygments.modeline.get_filetype_from_buffer(src)) is not None:
+        try:
+            return get_lexer(filetype, options)
+        except pygments.util.ClassNotFound:
+            pass
+
+    best: tuple[float, type[Lexer] | None] = (0.0, None)
+    for cls in _get_lexer_classes():
+        score = cls.analyse_text(src)
+        if score == 1.0:
+            return cls(**options)
+        if score > best[0]:
+            best = (score, cls)
+
+    if not best[0] or best[1] is None:
+        raise pygments.util.ClassNotFound("no lexer matching the text found")
+    return best[1](**options)
+
+
+def get_formatter(alias: str, options: dict[str, Any]) -> Formatter[str]:
+    """Get a formatter by one of its aliases, like `get_formatter_by_name`."""
+    if not (cls := _get_formatter_classes().get(alias)):
+        raise pygments.util.ClassNotFound(f"no formatter found for name {alias!r}")
+    return cls(**options)
+
+
+@functools.cache
+def get_fingerprint() -> str:
+    """
+    Get a fingerprint of everything other than a code block itself that affects how it
+    is highlighted, which is the versions of Markdown and Pygments and this module.
+    """
+    digest = hashlib.sha256()
+    for package in ["markdown", "pygments"]:
+        digest.update(f"{package}=={metadata.version(package)}\0".encode())
+    digest.update(pathlib.Path(__file__).read_bytes())
+    return digest.hexdigest()
+
+
+@functools.cache
+def _find_lexer_class(alias: str) -> type[Lexer] | None:
+    # Misses are cached too, so an unknown alias doesn't scan every plugin each time
+    try:
+        return pygments.lexers.find_lexer_class_by_name(alias)
+    except pygments.util.ClassNotFound:
+        return None
+
+
+@functools.cache
+def _get_formatter_classes() -> dict[str, type[Formatter[str]]]:
+    """
+    Get every formatter class by each of its aliases, with built in formatters taking
+    precedence over those from plugins like they do in Pygments.
+    """
+    classes: dict[str, type[Formatter[str]]] = {}
+    for cls in pygments.formatters.get_all_formatters():
+        for alias in cls.aliases:
+            classes.setdefault(alias, cls)
+    return classes
+
+
+@functools.cache
+def _get_lexer_classes() -> tuple[type[Lexer], ...]:
+    """
+    Get every lexer class, built in then from plugins, in the order Pygments tries them
+    when guessing a lexer.
+
+    Built-in lexers are ordered by their class name.
+    """
+    builtin = [
+        pygments.lexers.find_lexer_class(name)
+        for name, *_ in pygments.lexers.get_all_lexers(plugins=False)
+    ]
+    return (
+        *sorted((cls for cls in builtin if cls), key=lambda cls: cls.__name__),
+        *pygments.plugin.find_plugin_lexers(),
+    )
@@ -0,0 +1,85 @@
+import pathlib
+
+import markdown
+import pygments.lexers
+import pytest
+from markdown.extensions import codehilite, fenced_code
+
+from weaving import config_test, highlight
+
+SOURCES = [
+    ("python", "def hello():\n    print('Hello')\n"),
+    (None, "#!/usr/bin/env bash\necho hello\n"),
+    (None, "<html><body><p>Guess me</p></body></html>"),
+    ("not-a-language", "plain text"),
+    ("PYTHON", "x = 1"),
+]
+
+
+@pytest.mark.parametrize(("lang", "src"), SOURCES)
+def test_cached_code_hilite(lang: str | None, src: str) -> None:
+    highlight.clear()
+    expected = codehilite.CodeHilite(src, lang=lang, hl_lines=[1]).hilite()
+    assert highlight.CachedCodeHilite(src, lang=lang, hl_lines=[1]).hilite() == expected
+
+    # Cached, and distinct from the same code with other options
+    assert highlight.CachedCodeHilite(src, lang=lang, hl_lines=[1]).hilite() == expected
+    assert highlight.CachedCodeHilite(src, lang=lang).hilite() == (
+        codehilite.CodeHilite(src, lang=lang).hilite()
+    )
+
+
+@pytest.mark.parametrize(
+    "content", ["```python\nx = 1\n```", "Some text\n\n    #!python\n    x = 1\n"]
+)
+def test_cached_highlight(monkeypatch: pytest.MonkeyPatch, content: str) -> None:
+    highlighted: list[str] = []
+    original = highlight.CachedCodeHilite.hilite
+
+    def hilite(self: highlight.CachedCodeHilite, *, shebang: bool = True) -> str:
+        highlighted.append(self.src)
+        return original(self, shebang=shebang)
+
+    monkeypatch.setattr(highlight.CachedCodeHilite, "hilite", hilite)
+    extensions = ["fenced_code", "codehilite"]
+    expected = markdown.Markdown(extensions=extensions).convert(content)
+    assert not highlighted
+
+    cached = markdown.Markdown(extensions=[*extensions, highlight.CachedHighlight()])
+    assert cached.convert(content) == expected
+    assert len(highlighted) == 1
+
+    # Other converters are left highlighting code with the original class
+    assert (
+        codehilite.CodeHilite
+        is vars(fenced_code)["CodeHilite"]
+        is not highlight.CachedCodeHilite
+    )
+
+
+@pytest.mark.parametrize("src", [src for _, src in SOURCES])
+def test_guess_lexer(src: str) -> None:
+    assert type(highlight.guess_lexer(src, {})) is type(
+        pygments.lexers.guess_lexer(src)
+    )
+
+
+def test_disk_store(tmp_path: pathlib.Path) -> None:
+    highlight.configure(
+        config_test.fake_test_config(site_name="test", cache=tmp_path / "cache")
+    )
+    try:
+        highlight.clear()
+        html = highlight.CachedCodeHilite("x = 1", lang="python").hilite()
+
+        # Another process with an empty memory cache reads it from disk
+        highlight.clear()
+        [entry] = (tmp_path / "cache" / "highlight").glob("*/*")
+        assert entry.read_text() == html
+        entry.write_text("from disk")
+        assert highlight.CachedCodeHilite("x = 1", lang="python").hilite() == (
+            "from disk"
+        )
+    finally:
+        highlight.configure(config_test.fake_test_config(site_name="test"))
+        highlight.clear()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+from typing import TYPE_CHECKING
+
+import pydantic
+
+from weaving import config, logging
+
+if TYPE_CHECKING:
+    import pathlib
+    from collections.abc import Collection
+
+LOGGER = logging.getLogger()
+
+MANIFEST_VERSION = 2
+"""Bump whenever the manifest structure or digest semantics change."""
+
+_CONFIG_FINGERPRINT_EXCLUDE = {
+    "verbose",
+    "incremental",
+    "jobs",
+    "stage_concurrency",
+    "queue_size",
+    "trace",
+    "socket",
+    "shard",
+    "shards",
+    "cache",
+    "cache_size",
+    "static_checksum",
+    "static_copy",
+    "dead_links",
+    "allowed_links",
+    "base",
+    "templates",
+    "pages",
+    "static",
+    "output",
+}
+"""
+Config fields that have no effect on the generated site output. Input and output
+locations are excluded too, the contents of inputs are fingerprinted separately and
+outputs are only ever generated relative to the output directory.
+"""
+
+
+class ManifestEntry(pydantic.BaseModel):
+    """The recorded inputs and outputs of a single source file."""
+
+    digest: str
+    """Content hash of every input the source file's output depends on."""
+
+    outputs: list[str] = pydantic.Field(default_factory=list)
+    """Files generated from the source file, relative to the output directory."""
+
+    size: int | None = None
+    """The size of the source file, recorded for static files only."""
+
+    mtime_ns: int | None = None
+    """The modification time of the source file, recorded for static files only."""
+
+
+class BuildManifest(pydantic.BaseModel):
+    """Record of a completed build, used to drive incremental rebuilds."""
+
+    version: int = MANIFEST_VERSION
+    """The manifest format version, manifests from other versions are discarded."""
+
+    config: str = ""
+    """Fingerprint of the config values that affect the generated output."""
+
+    templates: str = ""
+    """Fingerprint of every file in the templates directory."""
+
+    shard: tuple[int, int] | None = None
+    """The shard built, as `(I, N)`, or `None` if every source file was built."""
+
+    pages: dict[str, ManifestEntry] = pydantic.Field(default_factory=dict)
+    """Markdown pages, keyed by their path relative to the pages directory."""
+
+    static: dict[str, ManifestEntry] = pydantic.Field(default_factory=dict)
+    """Static files, keyed by their path relative to the static directory."""
+
+    def get_outputs(self) -> set[str]:
+        """Get every output file recorded in the manifest."""
+        return {
+            output
+            for entries in (self.pages, self.static)
+            for entry in entries.values()
+            for output in entry.outputs
+        }
+
+
+def get_manifest_path(cfg: config.SiteGeneratorConfig) -> pathlib.Path:
+    """
+    Get the location of the build manifest for the configured output directory.
+
+    The manifest is kept next to, rather than inside, the output directory so it is
+    never deployed as part of the site.
+    """
+    return cfg.output.with_name(f".{cfg.output.name}.manifest.json")
+
+
+def load_manifest(cfg: config.SiteGeneratorConfig) -> BuildManifest | None:
+    """Load the manifest of the previous build, if there is a usable one."""
+    path = get_manifest_path(cfg)
+    try:
+        manifest = BuildManifest.model_validate_json(path.read_bytes())
+    except FileNotFoundError:
+        LOGGER.debug(f"No build manifest found at {cfg.format_relative_path(path)}")
+        return None
+    except Exception as ex:
+        LOGGER.debug(f"Ignoring unreadable build manifest: {ex}")
+        return None
+
+    if manifest.version != MANIFEST_VERSION:
+        LOGGER.debug(f"Ignoring build manifest with version {manifest.version}")
+        return None
+    return manifest
+
+
+def save_manifest(cfg: config.SiteGeneratorConfig, manifest: BuildManifest) -> None:
+    """Write out the manifest of a completed build."""
+    path = get_manifest_path(cfg)
+    path.write_text(manifest.model_dump_json(indent=2), encoding="utf-8")
+    LOGGER.debug(f"Build manifest written to {cfg.format_relative_path(path)}")
+
+
+def remove_manifest(cfg: config.SiteGeneratorConfig) -> None:
+    """Remove the manifest, so an interrupted build is never trusted."""
+    with contextlib.suppress(FileNotFoundError):
+        get_manifest_path(cfg).unlink()
+
+
+def hash_file(path: pathlib.Path) -> str:
+    """Get the SHA-256 hex digest of a file's contents."""
+    with path.open("rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def hash_values(*values: str) -> str:
+    """Get a single SHA-256 hex digest that covers every one of `values`."""
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_config_fingerprint(cfg: config.SiteGeneratorConfig) -> str:
+    """Get a fingerprint of the config values that affect the generated output."""
+    return hash_values(cfg.model_dump_json(exclude=_CONFIG_FINGERPRINT_EXCLUDE))
+
+
+def get_templates_fingerprint(cfg: config.SiteGeneratorConfig) -> str:
+    """
+    Get a fingerprint of the entire templates directory.
+
+    Templates extend and import each other freely, so any template change is treated as
+    a change to every page.
+    """
+    values = []
+    for path in sorted(p for p in cfg.templates.rglob("*") if p.is_file()):
+        values.extend([path.relative_to(cfg.templates).as_posix(), hash_file(path)])
+    return hash_values(*values)
+
+
+def get_subtree_digests(
+    directories: Collection[pathlib.Path], digests: dict[pathlib.Path, str]
+) -> dict[pathlib.Path, str]:
+    """
+    Get a digest of every page below each of `directories`, from the `digests` of
+    every page in the site.
+
+    A `blog_index` page renders the posts below it, so its output depends on every page
+    in its directory tree, not just its own contents. The digests are built in a single
+    pass over the pages, each page updating the digest of every one of its parents in
+    `directories`.
+    """
+    hashes = {directory: hashlib.sha256() for directory in directories}
+    if not hashes:
+        return {}
+
+    for path, digest in sorted(digests.items()):
+        for parent in path.parents:
+            if (subtree := hashes.get(parent)) is not None:
+                value = f"{path.relative_to(parent).as_posix()}:{digest}"
+                subtree.update(value.encode("utf-8") + b"\0")
+    return {directory: subtree.hexdigest() for directory, subtree in hashes.items()}
+
+
+def is_reusable(
+    cfg: config.SiteGeneratorConfig, entry: ManifestEntry, digest: str
+) -> bool:
+    """
+    Check if a previous build's manifest entry can be reused as is, because its inputs
+    are unchanged and all of its outputs are still on disk.
+    """
+    if entry.digest != digest:
+        return False
+    return all((cfg.output / output).is_file() for output in entry.outputs)
@@ -0,0 +1,43 @@
+import pathlib
+
+from weaving import config_test, manifest
+
+
+def test_get_subtree_digests() -> None:
+    digests = {
+        pathlib.Path("/pages/index.md"): "a",
+        pathlib.Path("/pages/about.md"): "b",
+        pathlib.Path("/pages/blog/index.md"): "c",
+        pathlib.Path("/pages/blog/post.md"): "d",
+        pathlib.Path("/pages/blogroll.md"): "e",
+    }
+    blog, root = pathlib.Path("/pages/blog"), pathlib.Path("/pages")
+
+    # Only the requested directories are digested
+    subtrees = manifest.get_subtree_digests([blog], digests)
+    assert subtrees == {
+        blog: manifest.hash_values("index.md:c", "post.md:d"),
+    }
+    assert manifest.get_subtree_digests([], digests) == {}
+
+    # A page changes the digest of every directory it's in
+    subtrees = manifest.get_subtree_digests([blog, root], digests)
+    digests[pathlib.Path("/pages/blog/post.md")] = "f"
+    changed = manifest.get_subtree_digests([blog, root], digests)
+    assert changed[blog] != subtrees[blog]
+    assert changed[root] != subtrees[root]
+
+    digests[pathlib.Path("/pages/about.md")] = "g"
+    assert manifest.get_subtree_digests([blog], digests) == {blog: changed[blog]}
+
+
+def test_is_reusable(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(output=tmp_path)
+    (tmp_path / "index.html").write_text("")
+    entry = manifest.ManifestEntry(digest="a", outputs=["index.html"])
+
+    assert manifest.is_reusable(cfg, entry, "a")
+    assert not manifest.is_reusable(cfg, entry, "b")
+
+    (tmp_path / "index.html").unlink()
+    assert not manifest.is_reusable(cfg, entry, "a")
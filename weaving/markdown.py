@@ -1,165 +1,320 @@
 from __future__ import annotations
 
 import datetime
-import os
+import functools
+import hashlib
 import pathlib
-import subprocess
-from typing import TYPE_CHECKING
+import re
+import threading
+from importlib import metadata
+from typing import TYPE_CHECKING, Any
 
 import markdown
+import pydantic
 import yaml
 
 from weaving import (
-    blog,
     config,
+    discovery,
     emoji,
-    errors,
     frontmatter,
+    highlight,
     logging,
     pymdx_class_tags,
-    template,
+    pymdx_page_info,
+    trace,
 )
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncIterator
+    from collections.abc import AsyncIterator, Iterable
+    from typing import TextIO
 
 LOGGER = logging.getLogger()
 
-
-async def markdown_pipeline(
+_CODE_RE = re.compile(r"```|~~~|^(?: {4}|\t)", re.MULTILINE)
+
+OPTIONAL_EXTENSIONS: dict[str, re.Pattern[str]] = {
+    "markdown.extensions.tables": re.compile(r"\|"),
+    "markdown.extensions.fenced_code": _CODE_RE,
+    "markdown.extensions.codehilite": _CODE_RE,
+    "pymdownx.betterem": re.compile(r"[*_]"),
+    "pymdownx.emoji": re.compile(r":[+\-\w]+:"),
+    "pymdownx.highlight": _CODE_RE,
+    "pymdownx.magiclink": re.compile(r"://|www\.|@", re.IGNORECASE),
+    "pymdownx.saneheaders": re.compile(r"#"),
+    "pymdownx.tasklist": re.compile(r"\[[ xX]\]"),
+    "pymdownx.tilde": re.compile(r"~"),
+}
+"""
+The Markdown extensions that are only needed by pages using the constructs they handle,
+in the order they are registered, each with a pattern that finds anything in a page
+that could be one of those constructs.
+
+Patterns err towards finding constructs that aren't there, because an extension being
+left out when a page needs it changes the page's HTML, while an extension that isn't
+needed just costs some time.
+"""
+
+
+def find_markdown(
     cfg: config.SiteGeneratorConfig, path: pathlib.Path
-) -> pathlib.Path | None:
-    """Process a markdown page into an HTML page."""
-    try:
-        return await _markdown_pipeline(cfg, path)
-    except Exception as ex:
-        raise errors.PipelineError(
-            f"Render pipeline failure for {cfg.format_relative_path(path)}: {ex}"
-        ) from ex
+) -> AsyncIterator[discovery.Entry]:
+    """
+    Find any Markdown files under a root `path`, skipping files ignored by `cfg`.
 
+    Current implementation just checks for file names that end in `.md`.
+    """
+    return discovery.find_files(
+        path, suffix=".md", ignore=discovery.IgnoreRules.from_config(cfg)
+    )
 
-async def _markdown_pipeline(
+
+# The C loader is many times faster than the pure Python loader, if libyaml is installed
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+async def load_markdown(
     cfg: config.SiteGeneratorConfig, path: pathlib.Path
-) -> pathlib.Path | None:
-    content, fm = await load_markdown(cfg, path)
-    if fm.debug and not cfg.debug_pages:
-        LOGGER.debug(f"Skipping debug markdown page: {path}")
-        return None
-
-    ctx = template.TemplateContext(
-        content=await render(content),
-        frontmatter=fm,
-        rendered_at=get_rendered_at(),
-        modified_at=get_modified_at(path),
-        git_sha=get_git_sha(),
-    )
+) -> tuple[str, frontmatter.PageFrontmatter]:
+    """
+    Read file at path and extract markdown content and any YAML frontmatter separately.
 
-    if fm.type == "blog_index":
-        return await blog.blog_index_pipeline(cfg, path, fm, ctx)
+    This does not parse the markdown content in any way, but does parse the YAML
+    frontmatter into `frontmatter.PageFrontmatter` using a safe YAML loader.
+    """
+    content, page_fm = await read_markdown(path)
+    return content, parse_frontmatter(cfg, path, page_fm)
 
-    html = await template.jinja(cfg.templates).render(ctx)
 
-    output = fm.get_output_path()
-    output.parent.mkdir(parents=True, exist_ok=True)
-    output.write_text(html)
+async def read_markdown(path: pathlib.Path) -> tuple[str, dict[str, Any]]:
+    """
+    Read file at path and extract markdown content and any raw YAML frontmatter values
+    separately.
+    """
+    with path.open("r", encoding="utf-8") as file:
+        header, content = _read_header(file)
+        content += file.read()
+
+    return content, _parse_header(header)
 
-    LOGGER.debug(
-        f"Markdown pipeline converted {cfg.format_relative_path(path)} "
-        f"to {cfg.format_relative_path(output)}"
-    )
-    return output
 
+async def read_content(path: pathlib.Path) -> str:
+    """Read file at path and return only its markdown content, without frontmatter."""
+    with path.open("r", encoding="utf-8") as file:
+        _, content = _read_header(file)
+        return content + file.read()
 
-async def find_markdown(path: pathlib.Path) -> AsyncIterator[pathlib.Path]:
+
+def read_frontmatter(path: pathlib.Path) -> tuple[dict[str, Any], bool]:
     """
-    Find any files Markdown files under a root `path`.
+    Read only the raw YAML frontmatter values from the start of the file at path,
+    without reading the rest of the file.
 
-    Current implementation just checks for file names that end in `.md`.
+    Also returns whether the file has any markdown content after its frontmatter.
     """
-    for dirpath, _, filenames in os.walk(path):
-        for filename in filenames:
-            if filename.endswith(".md"):
-                yield pathlib.Path(dirpath) / filename
+    with path.open("r", encoding="utf-8") as file:
+        header, content = _read_header(file)
 
+    return _parse_header(header), bool(content)
 
-async def load_markdown(
-    cfg: config.SiteGeneratorConfig, path: pathlib.Path
-) -> tuple[str, frontmatter.PageFrontmatter]:
+
+def _read_header(file: TextIO) -> tuple[list[str] | None, str]:
     """
-    Read file at path and extract markdown content and any YAML frontmatter separately.
+    Read the frontmatter header lines from the start of a markdown file, or `None` if
+    it has no frontmatter.
 
-    This does not parse the markdown content in any way, but does parse the YAML
-    frontmatter into `frontmatter.PageFrontmatter` using `yaml.safe_load`.
+    Also returns the start of the markdown content, which had to be read to find the end
+    of the header. The rest of the file is left unread.
     """
-    with path.open("r", encoding="utf-8") as file:
-        lines = file.readlines()
-
-    # Detect end of frontmatter — idx points to frontmatter end delimiter line
-    idx = 0
-    if len(lines) > 2 and lines[0] == "---\n":  # noqa: PLR2004
-        while idx < len(lines):
-            idx += 1
-            if idx + 1 < len(lines) and lines[idx] in ["---\n", "...\n"]:
-                idx += 1
-                break
-
-    content = "".join(lines[idx:])
-
-    page_fm = {}
-    if idx > 0:
-        page_fm = yaml.safe_load("".join(lines[1 : idx - 1]))
+    first = file.readline()
+    if first != "---\n":
+        return None, first
+
+    header: list[str] = []
+    line = file.readline()
+    while line:
+        # A delimiter on the last line of the file doesn't end the frontmatter
+        after = file.readline()
+        if line in ("---\n", "...\n") and after:
+            return header, after
+        header.append(line)
+        line = after
+
+    # Without an end delimiter, every line but the first and last is frontmatter, unless
+    # there are too few lines for any frontmatter at all
+    if len(header) > 1:
+        return header[:-1], ""
+    return None, first + "".join(header)
+
+
+def _parse_header(header: list[str] | None) -> dict[str, Any]:
+    if header is None:
+        return {}
+    return yaml.load("".join(header), Loader=_YAML_LOADER) or {}  # noqa: S506
+
+
+def parse_frontmatter(
+    cfg: config.SiteGeneratorConfig, path: pathlib.Path, page_fm: dict[str, Any]
+) -> frontmatter.PageFrontmatter:
+    """Parse raw YAML frontmatter values into `frontmatter.PageFrontmatter`."""
     fm = frontmatter.PageFrontmatter(file=path, **page_fm)
     fm.config = cfg
     fm.og = fm.get_open_graph()
+    return fm
 
-    return content, fm
 
+class RenderedMarkdown(pydantic.BaseModel):
+    """Markdown content converted to HTML."""
 
-async def render(content: str | None) -> str:
-    """Render Markdown content to HTML."""
-    if not content:
-        return ""
-
-    md = markdown.Markdown(
-        extensions=[
-            "markdown.extensions.tables",
-            "markdown.extensions.fenced_code",
-            "markdown.extensions.codehilite",
-            "pymdownx.betterem",
-            "pymdownx.emoji",
-            "pymdownx.highlight",
-            "pymdownx.magiclink",
-            "pymdownx.saneheaders",
-            "pymdownx.tasklist",
-            "pymdownx.tilde",
-            "nl2br",
-            pymdx_class_tags.ClassTags(),
-        ],
-        output_format="html",
-        extension_configs={
-            "pymdownx.emoji": {
-                "emoji_index": emoji.to_markdown_db,
-                "emoji_generator": emoji.to_unicode_emoji,
-            },
-            "pymdownx.tasklist": {
-                "custom_checkbox": True,
+    html: str = ""
+    """The content rendered as HTML."""
+
+    info: pymdx_page_info.PageInfo = pydantic.Field(
+        default_factory=pymdx_page_info.PageInfo
+    )
+    """Details of the content, like its preview, captured while it was rendered."""
+
+
+class MarkdownEngine:
+    """
+    A reusable Markdown to HTML converter with the site's extension pipeline.
+
+    Constructing a `markdown.Markdown` registers every extension's processors and
+    builds the emoji index, which costs more than converting most pages. An engine does
+    that once and resets the converter between documents instead.
+
+    An engine uses every extension in `OPTIONAL_EXTENSIONS` unless given the subset of
+    them to use in `extensions`. Those it doesn't use must not be needed by the content
+    it converts, or the HTML won't match what an engine with every extension converts.
+
+    Engines are not thread safe, use `get_engine` to get one for the current thread.
+    """
+
+    def __init__(self, extensions: Iterable[str] | None = None) -> None:
+        if extensions is None:
+            extensions = OPTIONAL_EXTENSIONS
+        self.extensions = frozenset(extensions)
+
+        self._page_info = pymdx_page_info.CapturePageInfo()
+        self._md = markdown.Markdown(
+            extensions=[
+                *(name for name in OPTIONAL_EXTENSIONS if name in self.extensions),
+                "nl2br",
+                pymdx_class_tags.ClassTags(),
+                highlight.CachedHighlight(),
+                self._page_info,
+            ],
+            output_format="html",
+            extension_configs={
+                "pymdownx.emoji": {
+                    "emoji_index": emoji.to_markdown_db,
+                    "emoji_generator": emoji.to_unicode_emoji,
+                },
+                "pymdownx.tasklist": {
+                    "custom_checkbox": True,
+                },
             },
-        },
+        )
+
+    def convert(self, content: str) -> RenderedMarkdown:
+        """Convert Markdown content to HTML, capturing its `PageInfo` on the way."""
+        try:
+            html = self._md.convert(content)
+            return RenderedMarkdown(html=html, info=self._page_info.info)
+        finally:
+            self._md.reset()
+
+
+_engines = threading.local()
+
+
+def get_engine(extensions: frozenset[str] | None = None) -> MarkdownEngine:
+    """
+    Get the `MarkdownEngine` with the optional `extensions` for the current thread,
+    creating it on first use, or the engine with every extension by default.
+
+    Every thread, including the main thread of each render worker process, reuses a
+    single engine for each set of extensions for every page it renders.
+    """
+    if extensions is None:
+        extensions = frozenset(OPTIONAL_EXTENSIONS)
+
+    engines: dict[frozenset[str], MarkdownEngine] | None = getattr(
+        _engines, "engines", None
     )
-    return md.convert(content)
+    if engines is None:
+        engines = _engines.engines = {}
+    if (engine := engines.get(extensions)) is None:
+        engine = engines[extensions] = MarkdownEngine(extensions)
+    return engine
 
 
-def get_rendered_at() -> datetime.datetime:
-    """Get the time a page is being rendered at."""
-    return datetime.datetime.now(datetime.UTC)
+def find_extensions(content: str) -> frozenset[str]:
+    """Find the optional Markdown extensions `content` could need to render."""
+    return frozenset(
+        name for name, pattern in OPTIONAL_EXTENSIONS.items() if pattern.search(content)
+    )
 
 
-def get_modified_at(path: pathlib.Path) -> datetime.datetime:
-    """Get the date and time the file was last modified time."""
-    return datetime.datetime.fromtimestamp(path.stat().st_mtime, datetime.UTC)
+async def render(
+    content: str | None, profile: frontmatter.MarkdownProfile = "auto"
+) -> RenderedMarkdown:
+    """
+    Render Markdown content to HTML.
 
+    With the `"auto"` profile, content is rendered with only the optional extensions
+    it could need. The `"full"` profile renders it with every extension.
+    """
+    if not content:
+        return RenderedMarkdown()
+    with trace.span("markdown"):
+        if profile == "full":
+            return get_engine().convert(content)
+        return get_engine(find_extensions(content)).convert(content)
+
+
+@functools.cache
+def get_render_fingerprint() -> str:
+    """
+    Get a fingerprint of everything other than the markdown content itself that affects
+    the output of `render`.
 
-def get_git_sha() -> str | None:
-    """Get the current git SHA."""
-    proc = subprocess.run(["git", "rev-parse", "HEAD"], check=True, capture_output=True)  # noqa: S607
-    return proc.stdout.decode("utf-8")
+    That is the versions of the Markdown, PyMdown Extensions, and Pygments packages, and
+    the source of the local modules that configure and extend them, including the emoji
+    DB. Paths and timestamps are deliberately excluded, so the fingerprint is stable
+    across checkouts.
+    """
+    digest = hashlib.sha256()
+    for package in ["markdown", "pymdown-extensions", "pygments"]:
+        digest.update(f"{package}=={metadata.version(package)}\0".encode())
+
+    emoji_dir = pathlib.Path(emoji.__file__).parent
+    for source in [
+        pathlib.Path(__file__),
+        pathlib.Path(pymdx_class_tags.__file__),
+        pathlib.Path(pymdx_page_info.__file__),
+        pathlib.Path(highlight.__file__),
+        emoji_dir / "emoji.py",
+        emoji_dir / "db.py",
+    ]:
+        digest.update(source.read_bytes())
+
+    return digest.hexdigest()
+
+
+def get_render_cache_key(
+    content: str, profile: frontmatter.MarkdownProfile = "auto"
+) -> str:
+    """
+    Get the key for the rendered HTML of `content` with the Markdown extension
+    `profile` in the render cache.
+    """
+    digest = hashlib.sha256(get_render_fingerprint().encode())
+    digest.update(f"{profile}\0".encode())
+    digest.update(content.encode())
+    return digest.hexdigest()
+
+
+def get_rendered_at() -> datetime.datetime:
+    """Get the time a page is being rendered at."""
+    return datetime.datetime.now(datetime.UTC)
@@ -0,0 +1,68 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from weaving import frontmatter, markdown
+
+PAGES = pathlib.Path(__file__).parent.parent / "pages"
+
+SNIPPETS = [
+    "Just a paragraph.\nWith a line break.",
+    "| a | b |\n|---|---|\n| 1 | 2 |",
+    "```python\nprint('hi')\n```",
+    "~~~\nplain fence\n~~~",
+    "Some text\n\n    indented code\n",
+    "- item\n\n    indented paragraph in a list",
+    "*em* **strong** _under_ __score__ snake_case_name",
+    "Emoji :smile: and :not_an_emoji: and 10:30:00",
+    "Visit https://example.com, www.example.com or mail me@example.com",
+    "<https://example.com> and [a link](https://example.com)",
+    "# Heading\n\n#NotAHeading\n\n## Another ##",
+    "- [ ] todo\n- [x] done\n- [X] also done",
+    "~~struck~~ and H~2~O and a single ~ tilde",
+    "Escapes \\| \\* \\_ \\~ \\# and &#35; &amp; entities",
+    "<div>\n*raw* :smile: https://example.com\n</div>",
+    "Setext heading\n==============\n\nSub\n---",
+]
+
+
+def _pages() -> list[pathlib.Path]:
+    return sorted(PAGES.rglob("*.md"))
+
+
+def _assert_same_as_full(content: str) -> None:
+    full = markdown.get_engine().convert(content)
+    auto = markdown.get_engine(markdown.find_extensions(content)).convert(content)
+    assert auto == full
+
+
+@pytest.mark.parametrize("content", SNIPPETS)
+def test_auto_profile_snippets(content: str) -> None:
+    _assert_same_as_full(content)
+
+
+@pytest.mark.parametrize("path", _pages(), ids=lambda path: path.name)
+def test_auto_profile_pages(path: pathlib.Path) -> None:
+    content = asyncio.run(markdown.read_content(path))
+    _assert_same_as_full(content)
+
+    # Every block on its own needs fewer extensions than the whole page
+    for block in content.split("\n\n"):
+        _assert_same_as_full(block)
+
+
+def test_find_extensions() -> None:
+    assert markdown.find_extensions("Just a paragraph.") == frozenset()
+    assert markdown.find_extensions("| a | b |\n\n~~c~~") == {
+        "markdown.extensions.tables",
+        "pymdownx.tilde",
+    }
+
+
+@pytest.mark.parametrize("profile", ["auto", "full"])
+def test_render_profile(profile: frontmatter.MarkdownProfile) -> None:
+    rendered = asyncio.run(markdown.render("Hello *world* :smile:", profile))
+    assert rendered.html == (
+        '<p class="content--p">Hello <em class="content--em">world</em> 😄</p>'
+    )
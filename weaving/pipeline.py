@@ -1,35 +1,545 @@
+from __future__ import annotations
+
 import asyncio
-import shutil
+import contextlib
+import dataclasses
 import time
+from typing import TYPE_CHECKING, Any
+
+from weaving import (
+    blog,
+    cache,
+    config,
+    discovery,
+    errors,
+    git,
+    logging,
+    manifest,
+    markdown,
+    registry,
+    shards,
+    site_model,
+    stages,
+    static,
+    template,
+    trace,
+    workers,
+    writer,
+)
+
+if TYPE_CHECKING:
+    import os
+    import pathlib
+    from collections.abc import Awaitable, Callable, Iterator
 
-from weaving import config, errors, logging, markdown, static
+    from weaving import frontmatter, pymdx_page_info
 
 LOGGER = logging.getLogger()
 
+DEFAULT_STAGE_CONCURRENCY = {"load": 8, "write": 8}
+"""
+Default number of concurrent workers for I/O bound stages. The CPU bound `render` and
+`template` stages default to twice the number of render worker processes.
+"""
+
+
+@dataclasses.dataclass(slots=True)
+class Job:
+    """A source file moving through the pipeline stages."""
+
+    path: pathlib.Path
+    """The path to the source file."""
+
+    entries: dict[str, manifest.ManifestEntry]
+    """The build manifest section to record the job's outputs in."""
+
+    key: str
+    """The key of the source file in the build manifest."""
+
+    digest: str
+    """
+    The digest of the source file's inputs to record in the build manifest, empty for a
+    static file until the write stage hashes it.
+    """
+
+    content: str = ""
+    """Markdown content of the page, then its content rendered as HTML."""
+
+    info: pymdx_page_info.PageInfo | None = None
+    """Details of the page's content captured while rendering it from markdown."""
+
+    page_fm: dict[str, Any] = dataclasses.field(default_factory=dict)
+    """Raw YAML frontmatter values of the page."""
+
+    fm: frontmatter.PageFrontmatter | None = None
+    """Parsed frontmatter of the page."""
+
+    html: str = ""
+    """The rendered HTML contents of the page's output file."""
+
+    stream: Iterator[str] | None = None
+    """
+    The HTML contents of the page's output file, rendered in chunks as the write stage
+    writes them, instead of `html` when pages are rendered in-process.
+    """
+
+    outputs: list[pathlib.Path] = dataclasses.field(default_factory=list)
+    """Output files written for the source file."""
+
+    stat: os.stat_result | None = None
+    """The stat result for the source file from when it was discovered."""
+
 
 async def pipeline(cfg: config.SiteGeneratorConfig) -> None:
-    """Generate the entire site once end-to-end."""
+    """
+    Generate the entire site once end-to-end.
+
+    Source files stream through a series of stages connected by bounded queues,
+    `discover → load → render → template → write` for markdown pages and
+    `discover → write` for static files. Rendering starts as soon as the first page is
+    discovered, and only a bounded number of pages are held in memory at once.
+
+    The site is built into a new generation of the output directory, which replaces the
+    live output only once the build succeeds. Outputs identical to the previous
+    generation are hard-linked from it rather than written again.
+
+    Static files whose size and modification time, or with `cfg.static_checksum` their
+    contents, are unchanged since the previous build are carried over from the previous
+    generation. When `cfg.incremental` is set, the same applies to markdown pages whose
+    inputs are unchanged. Otherwise, every page is rebuilt.
+
+    When `cfg.trace` is set, the time spent on each file in each stage is written to a
+    Chrome trace-event file and summarized in the log.
+    """
     time_st = time.time_ns()
-    try:
-        shutil.rmtree(cfg.output)
-        LOGGER.debug(f"{cfg.format_relative_path(cfg.output)} cleared")
-    except Exception as ex:
-        raise errors.PipelineError(
-            f"Cannot clear output directory {cfg.format_relative_path(cfg.output)}: "
-            f"{ex}"
-        ) from ex
-
-    tasks = []
-    async for page in markdown.find_markdown(cfg.pages):
-        tasks.append(markdown.markdown_pipeline(cfg, page))  # noqa: PERF401
-
-    async for file in static.find_static(cfg.static):
-        tasks.append(static.static_pipeline(cfg, file))  # noqa: PERF401
-
-    await asyncio.gather(*tasks)
+    tracer = trace.Tracer()
+
+    previous = manifest.load_manifest(cfg)
+    current = manifest.BuildManifest(
+        config=manifest.get_config_fingerprint(cfg),
+        templates=manifest.get_templates_fingerprint(cfg),
+        shard=cfg.shard,
+    )
+
+    if previous and previous.config != current.config:
+        LOGGER.debug("Config changed since the previous build, rebuilding all files")
+    elif cfg.incremental and previous and previous.templates != current.templates:
+        LOGGER.debug("Templates changed since the previous build, rebuilding all pages")
+
+    git_index = await git.load_index(cfg)
+    with (
+        writer.Generation(cfg.output) as generation,
+        writer.OutputWriter(
+            generation,
+            max_workers=cfg.stage_concurrency.get(
+                "write", DEFAULT_STAGE_CONCURRENCY["write"]
+            ),
+            copy_method=cfg.static_copy,
+        ) as output_writer,
+        workers.open_renderer(cfg) as renderer,
+        trace.tracing(tracer) if cfg.trace else contextlib.nullcontext(),
+    ):
+        build = _SiteBuild(cfg, renderer, output_writer, git_index, previous, current)
+        await build.run()
+
+        manifest.remove_manifest(cfg)
+        generation.commit()
+
+    site_model.save_site_model(cfg, build.site)
+
+    if cfg.incremental and previous:
+        dropped = previous.get_outputs() - current.get_outputs()
+        LOGGER.info(
+            f"Incremental build rebuilt {build.rebuilt} of "
+            f"{len(current.pages) + len(current.static)} files, "
+            f"removed {len(dropped)} orphaned outputs"
+        )
+    manifest.save_manifest(cfg, current)
+
+    if cfg.cache:
+        cache.evict(cfg.cache, cfg.cache_size * 1024 * 1024)
     time_en = time.time_ns()
 
+    LOGGER.info(f"Output files: {output_writer.stats.format()}")
     LOGGER.info(
         f"Site build complete in {(time_en - time_st) / 1_000_000:.3f}ms, "
         f"contents written to {cfg.format_relative_path(cfg.output)}"
     )
+
+    if cfg.trace:
+        tracer.write(cfg.trace)
+        LOGGER.info(
+            f"Build trace written to {cfg.format_relative_path(cfg.trace)}\n"
+            f"{tracer.summarize()}"
+        )
+
+
+class _SiteBuild:
+    """The stages of a single site build, and the state they share."""
+
+    def __init__(
+        self,
+        cfg: config.SiteGeneratorConfig,
+        renderer: workers.Renderer,
+        output_writer: writer.OutputWriter,
+        git_index: git.GitIndex,
+        previous: manifest.BuildManifest | None,
+        current: manifest.BuildManifest,
+    ) -> None:
+        self.cfg = cfg
+        self.renderer = renderer
+        self.output_writer = output_writer
+        self.git = git_index
+        self.current = current
+        self.rebuilt = 0
+
+        # The frontmatter of every page is indexed as it is discovered
+        self.snapshot = site_model.load_site_model(cfg)
+        self.site = site_model.SiteModel()
+
+        # Blog indexes are rendered once every other page is, from the registry
+        self.pages = registry.PageRegistry()
+        self.blog_indexes: list[Job] = []
+
+        # Sources are only reusable if nothing global to all of them has changed
+        self.previous_pages: dict[str, manifest.ManifestEntry] = {}
+        self.previous_static: dict[str, manifest.ManifestEntry] = {}
+        if previous and previous.config == current.config:
+            self.previous_static = previous.static
+            if cfg.incremental and previous.templates == current.templates:
+                self.previous_pages = previous.pages
+
+        self.load = self._stage("load", self._load)
+        self.render = self._stage("render", self._render)
+        self.template = self._stage("template", self._template)
+        self.write = self._stage("write", self._write, producers=2)
+
+    def _stage(
+        self,
+        name: str,
+        worker: Callable[[Job], Awaitable[None]],
+        producers: int = 1,
+    ) -> stages.Stage[Job]:
+        default = DEFAULT_STAGE_CONCURRENCY.get(name, self.renderer.jobs * 2)
+        return stages.Stage(
+            name,
+            worker,
+            concurrency=self.cfg.stage_concurrency.get(name, default),
+            queue_size=self.cfg.queue_size,
+            producers=producers,
+        )
+
+    async def run(self) -> None:
+        """Run every stage of the build until all source files are processed."""
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._discover())
+                group.create_task(self._run_stage(self.load, self.render))
+                group.create_task(self._run_stage(self.render, self.template))
+                group.create_task(self._run_templates())
+                group.create_task(self._run_stage(self.write))
+        except ExceptionGroup as ex:
+            raise stages.first_exception(ex) from None
+
+    async def _run_stage(
+        self, stage: stages.Stage[Job], downstream: stages.Stage[Job] | None = None
+    ) -> None:
+        LOGGER.debug(f"Starting {stage.name} stage with {stage.concurrency} workers")
+        await stage.run()
+        if downstream:
+            await downstream.close()
+
+    async def _run_templates(self) -> None:
+        """
+        Run the template stage, then render the blog indexes it held back.
+
+        The template stage only ends after the render stage, so by then every blog post
+        rendered in the build is in the page registry.
+        """
+        await self._run_stage(self.template)
+        await asyncio.gather(*[self._blog_index(job) for job in self.blog_indexes])
+        await self.write.close()
+
+    async def _discover(self) -> None:
+        """
+        Walk the pages and static directories, queueing every source file that needs
+        to be rebuilt.
+
+        Pages with the `blog_index` type list every post below them from the site
+        model, and their digest covers the digest of every page below them, so they are
+        held back until every page has been discovered.
+        """
+        digests: dict[pathlib.Path, str] = {}
+        indexes: list[discovery.Entry] = []
+        async for entry in markdown.find_markdown(self.cfg, self.cfg.pages):
+            with self._trace_source(entry.path), trace.span("discover"):
+                digest = digests[entry.path] = manifest.hash_file(entry.path)
+                page = self.site.add_page(entry.path, entry.stat, self.snapshot, digest)
+            if page.frontmatter.get("type") == "blog_index":
+                indexes.append(entry)
+            else:
+                await self._queue_page(entry, digest)
+
+        with trace.span("discover"):
+            subtrees = manifest.get_subtree_digests(
+                {entry.path.parent for entry in indexes}, digests
+            )
+        for entry in indexes:
+            await self._queue_page(entry, subtrees[entry.path.parent])
+        await self.load.close()
+
+        async for entry in static.find_static(self.cfg):
+            key = entry.path.relative_to(self.cfg.static).as_posix()
+            if not shards.is_in_shard(self.cfg, f"static/{key}"):
+                continue
+
+            job = Job(
+                entry.path,
+                self.current.static,
+                key,
+                self._get_static_digest(entry, key),
+                stat=entry.stat,
+            )
+            if not job.digest or not await self._reuse(job, self.previous_static):
+                await self.write.put(job)
+        await self.write.close()
+
+    def _get_static_digest(self, entry: discovery.Entry, key: str) -> str:
+        """
+        Get the digest of a static file from the previous build, if its size and
+        modification time are unchanged and `cfg.static_checksum` isn't set.
+
+        Static files are often large, so any other static file is left to be hashed on a
+        worker thread by the write stage, which returns an empty digest.
+        """
+        previous = self.previous_static.get(key)
+        if (
+            previous
+            and not self.cfg.static_checksum
+            and (previous.size, previous.mtime_ns)
+            == (entry.stat.st_size, entry.stat.st_mtime_ns)
+        ):
+            return previous.digest
+        return ""
+
+    async def _queue_page(self, entry: discovery.Entry, digest: str) -> None:
+        key = entry.path.relative_to(self.cfg.pages).as_posix()
+        if not shards.is_in_shard(self.cfg, f"pages/{key}"):
+            return
+
+        job = Job(
+            entry.path,
+            self.current.pages,
+            key,
+            digest,
+            page_fm=self.site.pages[entry.path.as_posix()].frontmatter,
+            stat=entry.stat,
+        )
+        if not await self._reuse(job, self.previous_pages):
+            await self.load.put(job)
+
+    async def _reuse(
+        self, job: Job, previous: dict[str, manifest.ManifestEntry]
+    ) -> bool:
+        entry = previous.get(job.key)
+        if (
+            entry
+            and manifest.is_reusable(self.cfg, entry, job.digest)
+            and all(
+                await asyncio.gather(
+                    *[
+                        self.output_writer.keep(self.cfg.output / output)
+                        for output in entry.outputs
+                    ]
+                )
+            )
+        ):
+            job.entries[job.key] = entry.model_copy(update=self._get_file_info(job))
+            return True
+
+        self.rebuilt += 1
+        return False
+
+    async def _load(self, job: Job) -> None:
+        """
+        Read a page's markdown content and parse its frontmatter, which was already read
+        into the site model when the page was discovered.
+        """
+        with self._pipeline_error(job), self._trace_source(job.path):
+            with trace.span("read"):
+                job.content = await markdown.read_content(job.path)
+            with trace.span("frontmatter"):
+                job.fm = markdown.parse_frontmatter(self.cfg, job.path, job.page_fm)
+
+        if job.fm.debug and not self.cfg.debug_pages:
+            LOGGER.debug(f"Skipping debug markdown page: {job.path}")
+            self._record(job)
+            return
+
+        await self.render.put(job)
+
+    async def _render(self, job: Job) -> None:
+        """Render a page's markdown content to HTML."""
+        with self._pipeline_error(job), self._trace_source(job.path):
+            rendered = await self.renderer.render_markdown(
+                job.content, job.fm.markdown if job.fm else "auto"
+            )
+            job.content, job.info = rendered.html, rendered.info
+            self._register(job, rendered)
+        await self.template.put(job)
+
+    def _register(self, job: Job, rendered: markdown.RenderedMarkdown) -> None:
+        """
+        Register a page that could be a blog post, so blog indexes in this build reuse
+        its frontmatter and preview.
+
+        The metadata blog indexes need is also cached, so a blog index rendered in
+        another shard doesn't have to render the page again.
+        """
+        if not job.fm:
+            return
+        page = self.pages.add(job.path, job.fm, blog.get_preview(rendered))
+        if not page or not self.cfg.cache or blog.get_cached_post(self.cfg, job.digest):
+            return
+
+        blog.cache_post(
+            self.cfg,
+            job.digest,
+            blog.PostMetadata(frontmatter=job.page_fm, preview=page.preview),
+        )
+
+    async def _template(self, job: Job) -> None:
+        """
+        Render a page's template with its content.
+
+        Blog index pages are held back until every other page is rendered, see
+        `_blog_index`.
+        """
+        with self._pipeline_error(job), self._trace_source(job.path):
+            if not job.fm:
+                raise ValueError(
+                    "Internal error rendering page, frontmatter not loaded"
+                )
+
+            if job.fm.type == "blog_index":
+                self.blog_indexes.append(job)
+                return
+
+            record = workers.PageRecord(
+                path=job.path,
+                content=job.content,
+                frontmatter=job.page_fm,
+                modified_at=self.git.get_modified_at(job.path, job.stat),
+                git_sha=self.git.sha,
+                info=job.info,
+            )
+            if self.renderer.streams:
+                # Rendered as it's written, so the whole page is never held in memory
+                job.stream = self.renderer.stream_page(record)
+            else:
+                job.html = await self.renderer.render_page(record)
+            job.content = ""
+
+        await self.write.put(job)
+
+    async def _blog_index(self, job: Job) -> None:
+        """
+        Render a blog index page with the posts below it.
+
+        Blog index pages are paginated into many output files, which are rendered and
+        written by the `blog_index` pipeline directly.
+        """
+        with self._pipeline_error(job), self._trace_source(job.path):
+            if not job.fm:
+                raise ValueError(
+                    "Internal error rendering page, frontmatter not loaded"
+                )
+
+            ctx = template.TemplateContext(
+                content=job.content,
+                frontmatter=job.fm,
+                rendered_at=markdown.get_rendered_at(),
+                modified_at=self.git.get_modified_at(job.path, job.stat),
+                git_sha=self.git.sha,
+                info=job.info,
+            )
+            with trace.span("blog_index"):
+                job.outputs = await blog.blog_index_pipeline(
+                    self.cfg,
+                    job.path,
+                    job.fm,
+                    ctx,
+                    self.site,
+                    self.pages,
+                    self.renderer,
+                    self.output_writer,
+                )
+            job.content = ""
+
+        await self.write.put(job)
+
+    async def _write(self, job: Job) -> None:
+        """Write a page or copy a static file to the output directory."""
+        if job.entries is self.current.static:
+            with self._trace_source(job.path):
+                if not job.digest:
+                    with trace.span("hash"):
+                        job.digest = await asyncio.to_thread(
+                            manifest.hash_file, job.path
+                        )
+                    if await self._reuse(job, self.previous_static):
+                        return
+
+                job.outputs = [
+                    await static.static_pipeline(self.cfg, job.path, self.output_writer)
+                ]
+        elif job.fm and (job.stream or job.html):
+            with self._pipeline_error(job), self._trace_source(job.path):
+                output = job.fm.get_output_path()
+                if job.stream:
+                    await self.output_writer.write_chunks(output, job.stream)
+                else:
+                    await self.output_writer.write_text(output, job.html)
+                job.outputs = [output]
+                job.html, job.stream = "", None
+
+                LOGGER.debug(
+                    "Markdown pipeline converted "
+                    f"{self.cfg.format_relative_path(job.path)} "
+                    f"to {self.cfg.format_relative_path(output)}"
+                )
+
+        self._record(job)
+
+    def _record(self, job: Job) -> None:
+        """Record a job's outputs in the build manifest."""
+        job.entries[job.key] = manifest.ManifestEntry(
+            digest=job.digest,
+            outputs=[o.relative_to(self.cfg.output).as_posix() for o in job.outputs],
+            **self._get_file_info(job),
+        )
+
+    def _get_file_info(self, job: Job) -> dict[str, Any]:
+        """
+        Get the size and modification time of a static file to record in the build
+        manifest, so the next build can skip hashing it if neither changed.
+        """
+        if job.entries is not self.current.static or not job.stat:
+            return {}
+        return {"size": job.stat.st_size, "mtime_ns": job.stat.st_mtime_ns}
+
+    def _trace_source(
+        self, path: pathlib.Path
+    ) -> contextlib.AbstractContextManager[None]:
+        """Attribute any spans recorded in the context to the source file at `path`."""
+        return trace.source(self.cfg.format_relative_path(path))
+
+    @contextlib.contextmanager
+    def _pipeline_error(self, job: Job) -> Iterator[None]:
+        try:
+            yield
+        except Exception as ex:
+            raise errors.PipelineError(
+                "Render pipeline failure for "
+                f"{self.cfg.format_relative_path(job.path)}: {ex}"
+            ) from ex
@@ -0,0 +1,180 @@
+import html.parser
+import math
+from typing import override
+from xml.etree import ElementTree as ET
+
+import markdown
+import pydantic
+from markdown import postprocessors, treeprocessors, util
+
+WORDS_PER_MINUTE = 200
+"""The reading speed used to estimate the reading time of a page."""
+
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+class Heading(pydantic.BaseModel):
+    """A heading in the outline of a page."""
+
+    level: int
+    """The heading level, from `1` for `<h1>` to `6` for `<h6>`."""
+
+    text: str
+    """The text content of the heading."""
+
+    id: str | None = None
+    """The `id` attribute of the heading element, if it has one."""
+
+
+class PageInfo(pydantic.BaseModel):
+    """Details of a page's content, captured while it is converted to HTML."""
+
+    preview: str | None = None
+    """The text of the page's first paragraph, or `None` if it has no paragraphs."""
+
+    word_count: int = 0
+    """The number of words in the page's content."""
+
+    reading_time: int = 0
+    """The estimated time to read the page's content, in whole minutes."""
+
+    outline: list[Heading] = pydantic.Field(default_factory=list)
+    """Every heading in the page, in document order."""
+
+
+class _TextParser(html.parser.HTMLParser):
+    """Collect the text content of an HTML fragment, or only of its first `<p>`."""
+
+    def __init__(self, *, first_paragraph: bool = False) -> None:
+        super().__init__(convert_charrefs=True)
+        self.text: list[str] = []
+        self.found = False
+        self._first_paragraph = first_paragraph
+        self._capturing = not first_paragraph
+        self._depth = 0
+
+    @override
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if not self._first_paragraph or tag != "p":
+            return
+        if not self.found:
+            self.found = self._capturing = True
+        if self._capturing:
+            self._depth += 1
+
+    @override
+    def handle_endtag(self, tag: str) -> None:
+        if self._first_paragraph and self._capturing and tag == "p":
+            self._depth -= 1
+            self._capturing = self._depth > 0
+
+    @override
+    def handle_data(self, data: str) -> None:
+        if self._capturing:
+            self.text.append(data)
+
+
+class _PageInfoProcessor(treeprocessors.Treeprocessor):
+    def __init__(self, md: markdown.Markdown, extension: "CapturePageInfo") -> None:
+        super().__init__(md)
+        self.md: markdown.Markdown = md
+        self._extension = extension
+
+    @override
+    def run(self, root: ET.Element) -> None:
+        words = len(self._get_text(root).split())
+        self._extension.info = PageInfo(
+            preview=self._get_preview(root),
+            word_count=words,
+            reading_time=math.ceil(words / WORDS_PER_MINUTE),
+            outline=[
+                Heading(
+                    level=int(element.tag[1]),
+                    text=self._get_text(element).strip(),
+                    id=element.get("id"),
+                )
+                for element in root.iter()
+                if element.tag in _HEADINGS
+            ],
+        )
+
+    def _get_preview(self, root: ET.Element) -> str | None:
+        """
+        Get the text of the first `<p>` in the document, as it will be in the HTML the
+        document is converted to.
+
+        Raw HTML and highlighted code blocks are stashed in a paragraph of their own,
+        which is replaced by the stashed HTML itself after conversion, so any paragraph
+        of stashed HTML is searched for a `<p>` instead.
+        """
+        for element in root.iter("p"):
+            if (raw := self._get_block_html(element)) is None:
+                return self._get_text(element)
+
+            parser = _TextParser(first_paragraph=True)
+            parser.feed(raw)
+            parser.close()
+            if parser.found:
+                return "".join(parser.text)
+        return None
+
+    def _get_block_html(self, element: ET.Element) -> str | None:
+        """
+        Get the stashed HTML a paragraph is replaced by, if it is replaced, which is
+        only when it is a plain `<p>` of nothing but a block-level HTML placeholder.
+        """
+        if element.attrib or len(element) or not element.text:
+            return None
+        if not (match := util.HTML_PLACEHOLDER_RE.fullmatch(element.text)):
+            return None
+
+        raw = self._get_stashed(int(match.group(1)))
+        raw_html = self.md.postprocessors["raw_html"]
+        if not isinstance(raw_html, postprocessors.RawHtmlPostprocessor):
+            return None
+        return raw if raw_html.isblocklevel(raw) else None
+
+    def _get_text(self, element: ET.Element) -> str:
+        """
+        Get the text content of an element, with any stashed HTML in it replaced by the
+        text content of that HTML.
+        """
+        text = "".join(element.itertext()).replace(util.AMP_SUBSTITUTE, "&")
+        return util.HTML_PLACEHOLDER_RE.sub(
+            lambda match: self._to_text(self._get_stashed(int(match.group(1)))), text
+        )
+
+    def _get_stashed(self, index: int) -> str:
+        stashed = self.md.htmlStash.rawHtmlBlocks[index]
+        if isinstance(stashed, str):
+            return stashed
+        return ET.tostring(stashed, encoding="unicode", method="html")
+
+    def _to_text(self, raw: str) -> str:
+        parser = _TextParser()
+        parser.feed(raw)
+        parser.close()
+        return "".join(parser.text)
+
+
+class CapturePageInfo(markdown.Extension):
+    """
+    Capture a `PageInfo` for each document converted, from the same ElementTree it is
+    converted to HTML from, rather than parsing the HTML again afterwards.
+
+    The info for the most recent document is available from `info` until the converter
+    is reset.
+    """
+
+    def __init__(self, **kwargs: object) -> None:
+        super().__init__(**kwargs)
+        self.info = PageInfo()
+
+    @override
+    def extendMarkdown(self, md: markdown.Markdown) -> None:
+        md.registerExtension(self)
+        # Runs after every other treeprocessor, so the tree is otherwise final
+        md.treeprocessors.register(_PageInfoProcessor(md, self), "page-info", -10)
+
+    def reset(self) -> None:
+        self.info = PageInfo()
@@ -0,0 +1,45 @@
+import markdown
+import pytest
+
+from weaving import pymdx_page_info
+
+
+def _convert(content: str) -> pymdx_page_info.PageInfo:
+    extension = pymdx_page_info.CapturePageInfo()
+    markdown.Markdown(extensions=["fenced_code", extension]).convert(content)
+    return extension.info
+
+
+def test_capture_page_info() -> None:
+    info = _convert(
+        "# Title {#ignored}\n\n"
+        "Hello *world* &amp; <span>everyone</span>.\n\n"
+        "## Second `heading`\n\n"
+        "```\ncode block\n```\n"
+    )
+    assert info.preview == "Hello world & everyone."
+    assert (info.word_count, info.reading_time) == (10, 1)
+    assert info.outline == [
+        pymdx_page_info.Heading(level=1, text="Title {#ignored}"),
+        pymdx_page_info.Heading(level=2, text="Second heading"),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("content", "preview"),
+    [
+        ("", None),
+        ("# Only a heading", None),
+        ("<div>\n<p>Inside &amp; raw HTML</p>\n</div>\n\nAfter", "Inside & raw HTML"),
+        ("<div>No paragraph</div>\n\nAfter", "After"),
+        ("<!-- comment -->\nBefore\n\nAfter", "Before"),
+    ],
+)
+def test_preview(content: str, preview: str | None) -> None:
+    assert _convert(content).preview == preview
+
+
+def test_reading_time() -> None:
+    words = pymdx_page_info.WORDS_PER_MINUTE + 1
+    info = _convert(" ".join(["word"] * words))
+    assert (info.word_count, info.reading_time) == (words, 2)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from weaving import frontmatter
+
+
+@dataclasses.dataclass(slots=True)
+class RegisteredPage:
+    """A page parsed and rendered earlier in the current build."""
+
+    frontmatter: frontmatter.PageFrontmatter
+    """Parsed frontmatter of the page."""
+
+    preview: str
+    """The page's preview, the text of its first paragraph."""
+
+
+class PageRegistry:
+    """
+    The pages parsed and rendered during a single build, so work done for one page is
+    never repeated for another that needs the same data, like a blog index listing its
+    posts.
+
+    Only blog posts are registered, which are the `blog` type pages that
+    `site_model.SiteModel` assigns to blog indexes, and only what a blog index lists of
+    them is kept. Every page's rendered content is dropped once it's written, so memory
+    use doesn't grow with the size of the site.
+    """
+
+    def __init__(self) -> None:
+        self._pages: dict[pathlib.Path, RegisteredPage] = {}
+
+    def add(
+        self,
+        path: pathlib.Path,
+        fm: frontmatter.PageFrontmatter,
+        preview: str,
+    ) -> RegisteredPage | None:
+        """Register a rendered page, if it's a blog post."""
+        if fm.type != "blog":
+            return None
+
+        page = self._pages[path] = RegisteredPage(frontmatter=fm, preview=preview)
+        return page
+
+    def get(self, path: pathlib.Path) -> RegisteredPage | None:
+        """Get a page registered earlier in the build, if there is one."""
+        return self._pages.get(path)
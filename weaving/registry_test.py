@@ -0,0 +1,30 @@
+import datetime as dt
+import pathlib
+
+from weaving import frontmatter, registry
+
+
+def test_page_registry() -> None:
+    pages = registry.PageRegistry()
+    post = pathlib.Path("pages/blog/post.md")
+    post_fm = frontmatter.PageFrontmatter(
+        file=post, type="blog", date=dt.date(2024, 1, 1)
+    )
+
+    page = pages.add(post, post_fm, "Hello")
+    assert page
+    assert page.preview == "Hello"
+    assert pages.get(post) is page
+
+    # A post can be the index page of its own directory
+    post_dir = pathlib.Path("pages/blog/post-dir/index.md")
+    assert pages.add(post_dir, post_fm.model_copy(update={"file": post_dir}), "Hello")
+
+    # Only blog posts are registered
+    index = pathlib.Path("pages/blog/index.md")
+    index_fm = post_fm.model_copy(update={"file": index, "type": "blog_index"})
+    assert not pages.add(index, index_fm, "Hello")
+    about = pathlib.Path("pages/about.md")
+    assert not pages.add(about, frontmatter.PageFrontmatter(file=about), "Hello")
+    assert not pages.get(index)
+    assert not pages.get(about)
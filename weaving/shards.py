@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import TYPE_CHECKING
+
+from weaving import errors, logging, manifest, writer
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from weaving import config
+
+LOGGER = logging.getLogger()
+
+
+def get_shard(key: str, count: int) -> int:
+    """
+    Get the shard, from `1` to `count`, that builds the source file with the manifest
+    `key`.
+
+    Shards are assigned from a hash of the key alone, so every machine agrees on the
+    assignment no matter what order it finds source files in.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8]) % count + 1
+
+
+def is_in_shard(cfg: config.SiteGeneratorConfig, key: str) -> bool:
+    """Check if the source file with the manifest `key` is built by `cfg.shard`."""
+    if not cfg.shard:
+        return True
+    index, count = cfg.shard
+    return get_shard(key, count) == index
+
+
+async def merge(cfg: config.SiteGeneratorConfig) -> None:
+    """
+    Combine the outputs of every shard of a sharded build into the output directory.
+
+    Every shard must be present exactly once and built from the same config and
+    templates, and no two shards may build the same source file or output file. The
+    combined build manifest is written alongside the output, so later incremental builds
+    can reuse the merged outputs.
+    """
+    shards = _load_shards(cfg)
+
+    merged = manifest.BuildManifest(
+        config=shards[0][1].config, templates=shards[0][1].templates
+    )
+    owners: dict[str, str] = {}
+    for shard, shard_manifest in shards:
+        for entries, merged_entries in [
+            (shard_manifest.pages, merged.pages),
+            (shard_manifest.static, merged.static),
+        ]:
+            for key, entry in entries.items():
+                if key in merged_entries:
+                    raise errors.MergeError(
+                        f"{key} was built by more than one shard, including "
+                        f"{cfg.format_relative_path(shard)}"
+                    )
+                merged_entries[key] = entry
+
+                for output in entry.outputs:
+                    if (owner := owners.setdefault(output, key)) != key:
+                        raise errors.MergeError(
+                            f"{output} is an output of both {owner} and {key}"
+                        )
+
+    with (
+        writer.Generation(cfg.output) as generation,
+        writer.OutputWriter(generation) as output_writer,
+    ):
+        await asyncio.gather(
+            *[
+                output_writer.copy_file(shard / output, cfg.output / output)
+                for shard, shard_manifest in shards
+                for output in sorted(shard_manifest.get_outputs())
+            ]
+        )
+
+        manifest.remove_manifest(cfg)
+        generation.commit()
+
+    manifest.save_manifest(cfg, merged)
+    LOGGER.info(
+        f"Merged {len(shards)} shards into {cfg.format_relative_path(cfg.output)}, "
+        f"{output_writer.stats.format()}"
+    )
+
+
+def _load_shards(
+    cfg: config.SiteGeneratorConfig,
+) -> list[tuple[pathlib.Path, manifest.BuildManifest]]:
+    """Load and check the build manifest of every shard, ordered by shard index."""
+    if not cfg.shards:
+        raise errors.MergeError("No shards to merge")
+
+    shards: dict[int, tuple[pathlib.Path, manifest.BuildManifest]] = {}
+    counts: set[int] = set()
+    for path in cfg.shards:
+        shard_manifest = manifest.load_manifest(cfg.model_copy(update={"output": path}))
+        if not shard_manifest or not shard_manifest.shard:
+            raise errors.MergeError(
+                f"{cfg.format_relative_path(path)} is not the output of a completed "
+                "shard build"
+            )
+
+        index, count = shard_manifest.shard
+        if index in shards:
+            raise errors.MergeError(
+                f"Shard {index}/{count} is in both "
+                f"{cfg.format_relative_path(shards[index][0])} and "
+                f"{cfg.format_relative_path(path)}"
+            )
+        shards[index] = (path, shard_manifest)
+        counts.add(count)
+
+    if len(counts) != 1:
+        raise errors.MergeError(
+            f"Shards were built with different numbers of shards: {sorted(counts)}"
+        )
+    if missing := set(range(1, counts.pop() + 1)) - shards.keys():
+        raise errors.MergeError(f"Missing shards: {sorted(missing)}")
+
+    first = shards[1][1]
+    for index, (path, shard_manifest) in shards.items():
+        if (shard_manifest.config, shard_manifest.templates) != (
+            first.config,
+            first.templates,
+        ):
+            raise errors.MergeError(
+                f"Shard {index} in {cfg.format_relative_path(path)} was built with a "
+                "different config or templates to shard 1"
+            )
+
+    return [shards[index] for index in sorted(shards)]
@@ -0,0 +1,70 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from weaving import config_test, errors, manifest, shards
+
+SHARD_COUNT = 4
+
+
+def test_get_shard() -> None:
+    keys = [f"pages/post-{idx}.md" for idx in range(100)]
+    assignment = [shards.get_shard(key, SHARD_COUNT) for key in keys]
+
+    assert assignment == [shards.get_shard(key, SHARD_COUNT) for key in keys]
+    assert set(assignment) == set(range(1, SHARD_COUNT + 1))
+
+
+def _build_shard(
+    path: pathlib.Path, shard: tuple[int, int], pages: dict[str, str]
+) -> pathlib.Path:
+    path.mkdir()
+    shard_manifest = manifest.BuildManifest(config="c", templates="t", shard=shard)
+    for key, output in pages.items():
+        (path / output).write_text(key)
+        shard_manifest.pages[key] = manifest.ManifestEntry(digest=key, outputs=[output])
+
+    cfg = config_test.fake_test_config(output=path)
+    manifest.save_manifest(cfg, shard_manifest)
+    return path
+
+
+def test_merge(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(
+        output=tmp_path / "output",
+        shards=[
+            _build_shard(tmp_path / "2", (2, 2), {"b.md": "b.html"}),
+            _build_shard(tmp_path / "1", (1, 2), {"a.md": "a.html"}),
+        ],
+    )
+    asyncio.run(shards.merge(cfg))
+
+    assert (tmp_path / "output" / "a.html").read_text() == "a.md"
+    assert (tmp_path / "output" / "b.html").read_text() == "b.md"
+
+    merged = manifest.load_manifest(cfg)
+    assert merged
+    assert merged.shard is None
+    assert merged.get_outputs() == {"a.html", "b.html"}
+
+
+def test_merge__missing_shard(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(
+        output=tmp_path / "output",
+        shards=[_build_shard(tmp_path / "1", (1, 2), {"a.md": "a.html"})],
+    )
+    with pytest.raises(errors.MergeError, match="Missing shards"):
+        asyncio.run(shards.merge(cfg))
+
+
+def test_merge__conflicting_outputs(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(
+        output=tmp_path / "output",
+        shards=[
+            _build_shard(tmp_path / "1", (1, 2), {"a.md": "index.html"}),
+            _build_shard(tmp_path / "2", (2, 2), {"b.md": "index.html"}),
+        ],
+    )
+    with pytest.raises(errors.MergeError, match=r"output of both a\.md and b\.md"):
+        asyncio.run(shards.merge(cfg))
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import os
+import pathlib
+import tempfile
+from typing import TYPE_CHECKING, Any
+
+import pydantic
+
+from weaving import logging, markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from weaving import config
+
+LOGGER = logging.getLogger()
+
+SITE_MODEL_VERSION = 1
+"""The current format version of site model snapshots."""
+
+
+class PageSummary(pydantic.BaseModel):
+    """What the site model knows about a single markdown page."""
+
+    size: int
+    """The size of the page's source file when its frontmatter was read."""
+
+    mtime_ns: int
+    """The modification time of the page's source file when its frontmatter was read."""
+
+    frontmatter: dict[str, Any]
+    """The raw YAML frontmatter values of the page."""
+
+    has_content: bool
+    """Whether the page has any markdown content after its frontmatter."""
+
+    digest: str | None = None
+    """The digest of the page's source file, if the build hashed it when indexing it."""
+
+
+class SiteModel(pydantic.BaseModel):
+    """
+    An index of the frontmatter of every markdown page in the site.
+
+    Building the index only reads the frontmatter at the start of each page, and the
+    index is saved as a snapshot in the persistent build cache. Pages whose size and
+    modification time match the snapshot aren't read again at all, so every consumer of
+    the site's frontmatter can load it for the whole site in one cheap pass.
+    """
+
+    version: int = SITE_MODEL_VERSION
+    """The snapshot format version, snapshots from other versions are discarded."""
+
+    pages: dict[str, PageSummary] = pydantic.Field(default_factory=dict)
+    """Every indexed page, keyed by the absolute path to its source file."""
+
+    _blog_posts: dict[str, list[str]] | None = pydantic.PrivateAttr(default=None)
+
+    def add_page(
+        self,
+        path: pathlib.Path,
+        stat: os.stat_result,
+        snapshot: SiteModel | None = None,
+        digest: str | None = None,
+    ) -> PageSummary:
+        """
+        Add the page at `path` to the index, reading its frontmatter unless `snapshot`
+        already indexed the page at the same size and modification time.
+
+        The `digest` of the page's source file is kept with it, so it's never hashed
+        again, like when a blog index looks up its posts' cached previews.
+        """
+        key = path.as_posix()
+        page = snapshot.pages.get(key) if snapshot else None
+        if not page or (page.size, page.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            page_fm, has_content = markdown.read_frontmatter(path)
+            page = PageSummary(
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                frontmatter=page_fm,
+                has_content=has_content,
+            )
+        if page.digest != digest:
+            page = page.model_copy(update={"digest": digest})
+
+        self.pages[key] = page
+        self._blog_posts = None
+        return page
+
+    def find_pages(
+        self, path: pathlib.Path
+    ) -> Iterator[tuple[pathlib.Path, PageSummary]]:
+        """Find every indexed page under the directory at `path`."""
+        for key, page in self.pages.items():
+            if (page_path := pathlib.Path(key)).is_relative_to(path):
+                yield page_path, page
+
+    def find_blog_posts(
+        self, path: pathlib.Path
+    ) -> list[tuple[pathlib.Path, PageSummary]]:
+        """Find the `blog` pages collated by the `blog_index` page at `path`."""
+        if self._blog_posts is None:
+            self._blog_posts = self._assign_blog_posts()
+        return [
+            (pathlib.Path(key), self.pages[key])
+            for key in self._blog_posts.get(path.as_posix(), [])
+        ]
+
+    def _assign_blog_posts(self) -> dict[str, list[str]]:
+        """
+        Assign every `blog` page to its nearest `blog_index` parent page, in one pass
+        over the site.
+
+        Blog indexes are keyed by their directory, so a post finds its index by looking
+        up each of its parent directories in turn, nearest first.
+        """
+        indexes = {
+            pathlib.PurePosixPath(key).parent: key
+            for key, page in self.pages.items()
+            if page.frontmatter.get("type") == "blog_index"
+        }
+
+        posts: dict[str, list[str]] = {key: [] for key in indexes.values()}
+        for key, page in self.pages.items():
+            if page.frontmatter.get("type") != "blog":
+                continue
+            for parent in pathlib.PurePosixPath(key).parents:
+                if index := indexes.get(parent):
+                    posts[index].append(key)
+                    break
+        return posts
+
+
+def get_snapshot_path(cfg: config.SiteGeneratorConfig) -> pathlib.Path | None:
+    """Get the location of the site model snapshot, if there's a build cache."""
+    return cfg.cache / "site_model.json" if cfg.cache else None
+
+
+def load_site_model(cfg: config.SiteGeneratorConfig) -> SiteModel:
+    """Load the site model snapshot, or an empty site model if there isn't one."""
+    if not (path := get_snapshot_path(cfg)):
+        return SiteModel()
+
+    try:
+        model = SiteModel.model_validate_json(path.read_bytes())
+    except FileNotFoundError:
+        return SiteModel()
+    except Exception as ex:
+        LOGGER.debug(f"Ignoring unreadable site model snapshot: {ex}")
+        return SiteModel()
+
+    if model.version != SITE_MODEL_VERSION:
+        LOGGER.debug(f"Ignoring site model snapshot with version {model.version}")
+        return SiteModel()
+    return model
+
+
+def save_site_model(cfg: config.SiteGeneratorConfig, model: SiteModel) -> None:
+    """
+    Write out the site model snapshot.
+
+    The snapshot is written to a temporary file then renamed into place, so concurrent
+    builds sharing a cache never see a partial snapshot.
+    """
+    if not (path := get_snapshot_path(cfg)):
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    tmp = pathlib.Path(name)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(model.model_dump_json().encode("utf-8"))
+        tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+async def scan_site_model(cfg: config.SiteGeneratorConfig) -> SiteModel:
+    """
+    Index every markdown page under `cfg.pages`, starting from the snapshot of the
+    previous scan, then save the updated snapshot.
+
+    Pages are indexed in the order they are discovered, and pages that no longer exist
+    are dropped from the snapshot.
+    """
+    snapshot = load_site_model(cfg)
+    model = SiteModel()
+    async for entry in markdown.find_markdown(cfg, cfg.pages):
+        model.add_page(entry.path, entry.stat, snapshot)
+
+    save_site_model(cfg, model)
+    return model
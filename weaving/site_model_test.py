@@ -0,0 +1,78 @@
+import asyncio
+import os
+import pathlib
+
+from weaving import config_test, site_model
+
+
+def test_scan_site_model(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(
+        base=tmp_path, pages=tmp_path / "pages", cache=tmp_path / "cache"
+    )
+    post = cfg.pages / "blog" / "post.md"
+    post.parent.mkdir(parents=True)
+    post.write_text("---\ntitle: Post\n---\nHello\n")
+    (cfg.pages / "empty.md").write_text("---\ntitle: Empty\nmeta: {}\n")
+
+    model = asyncio.run(site_model.scan_site_model(cfg))
+    summaries = {
+        path.relative_to(cfg.pages).as_posix(): (page.frontmatter, page.has_content)
+        for path, page in model.find_pages(cfg.pages)
+    }
+    assert summaries == {
+        "blog/post.md": ({"title": "Post"}, True),
+        "empty.md": ({"title": "Empty"}, False),
+    }
+    assert site_model.load_site_model(cfg) == model
+
+
+def test_scan_site_model__snapshot(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(
+        base=tmp_path, pages=tmp_path / "pages", cache=tmp_path / "cache"
+    )
+    page = cfg.pages / "index.md"
+    page.write_text("---\ntitle: One\n---\nHello\n")
+    asyncio.run(site_model.scan_site_model(cfg))
+
+    # Unchanged size and modification time, so the snapshot is trusted
+    stat = page.stat()
+    page.write_text("---\ntitle: Two\n---\nHello\n")
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    model = asyncio.run(site_model.scan_site_model(cfg))
+    assert model.pages[page.as_posix()].frontmatter == {"title": "One"}
+
+    page.write_text("---\ntitle: Three\n---\nHello\n")
+    model = asyncio.run(site_model.scan_site_model(cfg))
+    assert model.pages[page.as_posix()].frontmatter == {"title": "Three"}
+
+
+def test_find_blog_posts(tmp_path: pathlib.Path) -> None:
+    cfg = config_test.fake_test_config(base=tmp_path, pages=tmp_path / "pages")
+    for name, page_type in [
+        ("blog/index.md", "blog_index"),
+        ("blog/first.md", "blog"),
+        ("blog/2024/second.md", "blog"),
+        ("blog/about.md", "default"),
+        ("blog/news/index.md", "blog_index"),
+        ("blog/news/third.md", "blog"),
+        ("blog/news/2024/fourth.md", "blog"),
+        ("orphan.md", "blog"),
+    ]:
+        (cfg.pages / name).parent.mkdir(parents=True, exist_ok=True)
+        (cfg.pages / name).write_text(f"---\ntype: {page_type}\n---\nHello\n")
+
+    model = asyncio.run(site_model.scan_site_model(cfg))
+
+    def find(index: str) -> list[str]:
+        return sorted(
+            path.relative_to(cfg.pages).as_posix()
+            for path, _ in model.find_blog_posts(cfg.pages / index)
+        )
+
+    # Posts are only collated by their nearest blog index
+    assert find("blog/index.md") == ["blog/2024/second.md", "blog/first.md"]
+    assert find("blog/news/index.md") == [
+        "blog/news/2024/fourth.md",
+        "blog/news/third.md",
+    ]
+    assert find("orphan.md") == []
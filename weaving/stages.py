@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+
+class Stage[T]:
+    """
+    A pipeline stage that runs a fixed number of concurrent workers over items taken
+    from a bounded queue.
+
+    Producers block in `put` while the queue is full, which applies backpressure all
+    the way back to discovery, so only a bounded number of items are in flight at once
+    no matter how large the site is.
+
+    A stage finishes once every one of its producers has called `close` and the queue
+    has drained. Workers pass on results by calling `put` on the next stage directly.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        worker: Callable[[T], Awaitable[None]],
+        *,
+        concurrency: int,
+        queue_size: int,
+        producers: int = 1,
+    ) -> None:
+        self.name = name
+        self.concurrency = max(concurrency, 1)
+        self._worker = worker
+        self._queue: asyncio.Queue[T | None] = asyncio.Queue(maxsize=queue_size)
+        self._producers = producers
+
+    async def put(self, item: T) -> None:
+        """Queue an item for processing, waiting while the queue is full."""
+        await self._queue.put(item)
+
+    async def close(self) -> None:
+        """Signal that one of the stage's producers will not queue any more items."""
+        self._producers -= 1
+        if self._producers == 0:
+            for _ in range(self.concurrency):
+                await self._queue.put(None)
+
+    async def run(self) -> None:
+        """Process queued items until the stage is closed and its queue drained."""
+        async with asyncio.TaskGroup() as group:
+            for _ in range(self.concurrency):
+                group.create_task(self._run_worker())
+
+    async def _run_worker(self) -> None:
+        while (item := await self._queue.get()) is not None:
+            await self._worker(item)
+
+
+def first_exception(group: BaseExceptionGroup[BaseException]) -> BaseException:
+    """
+    Get the first exception raised within a (possibly nested) exception group.
+
+    Once one stage fails every other stage is cancelled, so the first exception is the
+    one worth reporting.
+    """
+    ex = group.exceptions[0]
+    if isinstance(ex, BaseExceptionGroup):
+        return first_exception(ex)
+    return ex
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from weaving import stages
+
+
+def test_stage() -> None:
+    results: list[int] = []
+
+    async def double(item: int) -> None:
+        await second.put(item * 2)
+
+    async def collect(item: int) -> None:
+        results.append(item)
+
+    first = stages.Stage[int]("first", double, concurrency=3, queue_size=1)
+    second = stages.Stage[int]("second", collect, concurrency=1, queue_size=1)
+
+    async def produce() -> None:
+        for item in range(10):
+            await first.put(item)
+        await first.close()
+
+    async def run_first() -> None:
+        await first.run()
+        await second.close()
+
+    async def run() -> None:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(produce())
+            group.create_task(run_first())
+            group.create_task(second.run())
+
+    asyncio.run(run())
+    assert sorted(results) == [item * 2 for item in range(10)]
+
+
+def test_stage__multiple_producers() -> None:
+    results: list[str] = []
+
+    async def collect(item: str) -> None:
+        results.append(item)
+
+    stage = stages.Stage[str](
+        "stage", collect, concurrency=2, queue_size=1, producers=2
+    )
+
+    async def produce(name: str) -> None:
+        await stage.put(name)
+        await stage.close()
+
+    async def run() -> None:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(stage.run())
+            group.create_task(produce("a"))
+            group.create_task(produce("b"))
+
+    asyncio.run(run())
+    assert sorted(results) == ["a", "b"]
+
+
+def test_first_exception() -> None:
+    error = ValueError("first")
+    group = ExceptionGroup("outer", [ExceptionGroup("inner", [error]), KeyError()])
+    assert stages.first_exception(group) is error
+
+
+def test_stage__worker_error() -> None:
+    async def fail(item: int) -> None:
+        raise ValueError(f"bad item {item}")
+
+    stage = stages.Stage[int]("stage", fail, concurrency=1, queue_size=2)
+
+    async def run() -> None:
+        await stage.put(1)
+        await stage.close()
+        await stage.run()
+
+    with pytest.raises(ExceptionGroup) as ex:
+        asyncio.run(run())
+    assert str(stages.first_exception(ex.value)) == "bad item 1"
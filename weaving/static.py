@@ -1,15 +1,15 @@
-import os
 import pathlib
-import shutil
 from collections.abc import AsyncIterator
 
-from weaving import config, errors, logging
+from weaving import config, discovery, errors, logging, writer
 
 LOGGER = logging.getLogger()
 
 
 async def static_pipeline(
-    cfg: config.SiteGeneratorConfig, path: pathlib.Path
+    cfg: config.SiteGeneratorConfig,
+    path: pathlib.Path,
+    output_writer: writer.OutputWriter,
 ) -> pathlib.Path:
     """
     Process a static file by copying it into the same relative location in the output
@@ -24,8 +24,7 @@ async def static_pipeline(
         ) from ex
 
     try:
-        output.parent.mkdir(parents=True, exist_ok=True)
-        output = shutil.copy(path, output)
+        await output_writer.copy_file(path, output)
     except Exception as ex:
         raise errors.PipelineError(
             f"Unable to write static file {cfg.format_relative_path(path)} to output: "
@@ -39,8 +38,8 @@ async def static_pipeline(
     return output
 
 
-async def find_static(path: pathlib.Path) -> AsyncIterator[pathlib.Path]:
-    """Find any files static files under a root `path`."""
-    for dirpath, _, filenames in os.walk(path):
-        for filename in filenames:
-            yield pathlib.Path(dirpath) / filename
+def find_static(cfg: config.SiteGeneratorConfig) -> AsyncIterator[discovery.Entry]:
+    """Find any static files under `cfg.static`, skipping files ignored by `cfg`."""
+    return discovery.find_files(
+        cfg.static, ignore=discovery.IgnoreRules.from_config(cfg)
+    )
@@ -1,19 +1,39 @@
+import contextlib
 import datetime
 import functools
+import hashlib
 import pathlib
 import re
-from typing import Any
+from collections.abc import Iterable, Iterator
+from importlib import metadata
+from typing import Any, override
 
 import jinja2
+import jinja2.bccache
 import pydantic
 
-from weaving import frontmatter, logging
+from weaving import cache, frontmatter, logging, pymdx_page_info, trace
 
 LOGGER = logging.getLogger()
 
+TIDY_CHUNK_SIZE = 16 * 1024
+"""The amount of rendered HTML `tidy_html_chunks` gathers before tidying it."""
+
+RENDER_CACHE_SIZE = 256
+"""The number of page contents compiled by the `render` filter kept in memory."""
+
+_NEWLINE_RE = re.compile(r"\r\n|\r|\n")
+
 
 class TemplateContext(pydantic.BaseModel):
-    """Template context for rendering `default` type pages."""
+    """
+    Template context for rendering `default` type pages.
+
+    Values that are already models, like the page's frontmatter, are kept by reference
+    rather than copied or validated again. Build a context from another one with
+    `dict(ctx)`, not `ctx.model_dump()`, which would copy the frontmatter and the site
+    config it references into dicts, only for them to be validated all over again.
+    """
 
     content: str
     """Pre-rendered page content as HTML."""
@@ -30,6 +50,12 @@ class TemplateContext(pydantic.BaseModel):
     git_sha: str | None
     """The git SHA of the current HEAD commit during the build process."""
 
+    info: pymdx_page_info.PageInfo | None = None
+    """
+    Details of the page content, like its word count, reading time, and outline of
+    headings.
+    """
+
 
 class BlogIndexPostContext(pydantic.BaseModel):
     """Template context for blog posts on a blog index."""
@@ -54,19 +80,219 @@ class BlogIndexTemplateContext(TemplateContext):
     """The maximum number of blog index pages to be rendered."""
 
 
+class BytecodeCache(jinja2.BytecodeCache):
+    """
+    A Jinja bytecode cache kept in a `cache.DiskCache`, so templates compiled by one
+    process are loaded by every later process instead of being compiled again.
+
+    Compiled templates are keyed by the Jinja version, the environment options that
+    change the compiled code, and the template's name and source, never its path, so a
+    clean checkout of the same templates gets cache hits.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self._cache = cache.DiskCache(path)
+
+    @override
+    def get_bucket(
+        self,
+        environment: jinja2.Environment,
+        name: str,
+        filename: str | None,
+        source: str,
+    ) -> jinja2.bccache.Bucket:
+        digest = hashlib.sha256()
+        for value in [
+            metadata.version("jinja2"),
+            environment.is_async,
+            environment.autoescape,
+            sorted(environment.extensions),
+            name,
+        ]:
+            digest.update(f"{value!r}\0".encode())
+        digest.update(source.encode())
+
+        bucket = jinja2.bccache.Bucket(
+            environment, digest.hexdigest(), self.get_source_checksum(source)
+        )
+        self.load_bytecode(bucket)
+        return bucket
+
+    @override
+    def load_bytecode(self, bucket: jinja2.bccache.Bucket) -> None:
+        if (value := self._cache.get(bucket.key)) is not None:
+            bucket.bytecode_from_string(value)
+
+    @override
+    def dump_bytecode(self, bucket: jinja2.bccache.Bucket) -> None:
+        self._cache.set(bucket.key, bucket.bytecode_to_string())
+
+
 class TemplateRenderer:
-    """Render templates in a persistent Jinja environment."""
+    """
+    Render templates in a persistent Jinja environment.
+
+    When `bytecode_cache` is set, compiled templates are kept in a persistent cache
+    there, so only templates that changed are compiled from source.
 
-    def __init__(self, templates: pathlib.Path) -> None:
+    Templates are rendered synchronously, unless `is_async` is set. Templates never wait
+    on any I/O, so Jinja's async mode only adds the overhead of awaiting every loop,
+    filter, and macro call, see `python -m weaving.benchmarks templates`. In async mode
+    templates are rendered with `render_async` instead of `render` or `generate`.
+    """
+
+    def __init__(
+        self,
+        templates: pathlib.Path,
+        bytecode_cache: pathlib.Path | None = None,
+        *,
+        is_async: bool = False,
+    ) -> None:
         self.env = jinja2.Environment(
             loader=jinja2.FileSystemLoader(templates),
             autoescape=True,
-            enable_async=True,
+            enable_async=is_async,
+            bytecode_cache=BytecodeCache(bytecode_cache) if bytecode_cache else None,
+        )
+        self.env.filters["render"] = (
+            self._render_filter_async if is_async else self._render_filter
         )
-        self.env.filters["render"] = _render_filter
 
-    async def render(self, ctx: TemplateContext) -> str:
+        self._compiled: cache.MemoryCache[str, jinja2.Template] = cache.MemoryCache(
+            RENDER_CACHE_SIZE
+        )
+        self._syntax = [
+            self.env.block_start_string,
+            self.env.variable_start_string,
+            self.env.comment_start_string,
+            *(
+                prefix
+                for prefix in [
+                    self.env.line_statement_prefix,
+                    self.env.line_comment_prefix,
+                ]
+                if prefix
+            ),
+        ]
+
+    @jinja2.pass_context
+    def _render_filter(self, ctx: jinja2.runtime.Context, value: Any) -> str:
+        """
+        Implements a filter that passes HTML through the Jinja renderer.
+
+        This is used so we can put Jinja markup in markdown source pages and have it
+        rendered correctly in the output page.
+        """
+        if not value:
+            return ""
+
+        if not isinstance(value, str):
+            value = str(value)
+
+        try:
+            if not (template := self._compile_content(value)):
+                return self._as_template_data(value)
+            return template.render(**ctx.get_all())
+        except Exception:
+            LOGGER.exception(f"Failed to render template {value=}")
+            raise
+
+    @jinja2.pass_context
+    async def _render_filter_async(
+        self, ctx: jinja2.runtime.Context, value: Any
+    ) -> str:
+        """The `render` filter in async mode, see `_render_filter`."""
+        if not value or not (template := self._compile_content(str(value))):
+            return self._render_filter(ctx, value)
+
+        try:
+            return await template.render_async(**ctx.get_all())
+        except Exception:
+            LOGGER.exception(f"Failed to render template {value=}")
+            raise
+
+    def _compile_content(self, value: str) -> jinja2.Template | None:
+        """
+        Compile content passed to the `render` filter into a template, or return `None`
+        if the content has no Jinja syntax to render.
+
+        Compiled templates are kept in a bounded LRU cache keyed by a hash of the
+        content, so content rendered again, like a page rebuilt by the dev server or the
+        same content on every page of a blog index, is only compiled once.
+        """
+        if not any(syntax in value for syntax in self._syntax):
+            return None
+
+        key = hashlib.sha256(value.encode()).hexdigest()
+        if (template := self._compiled.get(key)) is None:
+            template = self.env.from_string(value)
+            self._compiled.set(key, template)
+        return template
+
+    def _as_template_data(self, value: str) -> str:
+        """
+        Get content without any Jinja syntax exactly as rendering it as a template would
+        output it, with its newlines normalized and a single trailing newline removed.
+        """
+        if "\r" not in value and self.env.newline_sequence == "\n":
+            # Already normalized, so only the trailing newline can change
+            if self.env.keep_trailing_newline or not value.endswith("\n"):
+                return value
+            return value[:-1]
+
+        lines = _NEWLINE_RE.split(value)
+        if not self.env.keep_trailing_newline and lines[-1] == "":
+            del lines[-1]
+        return self.env.newline_sequence.join(lines)
+
+    def compile_templates(self) -> list[str]:
+        """
+        Compile every template ahead of time, returning the names of the templates.
+
+        Compiled templates are kept by the environment, and in the bytecode cache if
+        there is one, so rendering any of them later only needs a cache lookup.
+        """
+        names = self.env.list_templates()
+        for name in names:
+            self.env.get_template(name)
+        return names
+
+    def render(self, ctx: TemplateContext) -> str:
         """Render the named template with the provided render context."""
+        return "".join(self.generate(ctx))
+
+    def generate(self, ctx: TemplateContext) -> Iterator[str]:
+        """
+        Render the named template with the provided render context, yielding the tidied
+        HTML in chunks as it's rendered, rather than holding the whole page in memory.
+
+        Rendering and tidying are traced as separate `jinja` and `tidy_html` spans,
+        which only cover producing the chunks, not whatever the caller does with them.
+        """
+        rendering = trace.Stopwatch("jinja")
+        tidying = trace.Stopwatch("tidy_html")
+        try:
+            with self._rewrite_errors():
+                with rendering.running():
+                    template = self._select_template(ctx)
+                chunks = trace.timed(
+                    template.generate(ctx=ctx), rendering, pause=tidying
+                )
+                yield from trace.timed(tidy_html_chunks(chunks), tidying)
+        finally:
+            rendering.record()
+            tidying.record()
+
+    async def render_async(self, ctx: TemplateContext) -> str:
+        """Render the named template with the provided render context in async mode."""
+        with self._rewrite_errors(), trace.span("jinja"):
+            template = self._select_template(ctx)
+            html = await template.render_async(ctx=ctx)
+
+        with trace.span("tidy_html"):
+            return tidy_html(html)
+
+    def _select_template(self, ctx: TemplateContext) -> jinja2.Template:
         cfg = ctx.frontmatter.config
         if not cfg:
             raise ValueError("Internal error rendering template, config must be set")
@@ -76,10 +302,13 @@ class TemplateRenderer:
             f"{ctx.frontmatter.type}.html",
             cfg.default_template,
         ]
+        return self.env.get_or_select_template([t for t in templates if t])
 
+    @contextlib.contextmanager
+    def _rewrite_errors(self) -> Iterator[None]:
+        """Rewrite errors for undefined template variables to be easier to follow."""
         try:
-            template = self.env.get_or_select_template([t for t in templates if t])
-            html = await template.render_async(ctx=ctx)
+            yield
         except jinja2.TemplateError as ex:
             if (
                 ex.message
@@ -89,35 +318,16 @@ class TemplateRenderer:
                 ex.args = (f'Unknown template context field "{field}".',)
             raise
 
-        return tidy_html(html)
-
 
 @functools.cache
-def jinja(templates: pathlib.Path) -> TemplateRenderer:
-    """Get a `TemplateRenderer` for the templates in the provided directory."""
-    return TemplateRenderer(templates)
-
-
-@jinja2.pass_context
-async def _render_filter(ctx: jinja2.runtime.Context, value: Any) -> str:
+def jinja(
+    templates: pathlib.Path, cache_path: pathlib.Path | None = None
+) -> TemplateRenderer:
     """
-    Implements a filter that passes HTML through the Jinja renderer.
-
-    This is used so we can put Jinja markup in markdown source pages and have it
-    rendered correctly in the output page.
+    Get a `TemplateRenderer` for the templates in the provided directory, keeping
+    compiled templates in the persistent build cache at `cache_path` if it is set.
     """
-    if not value:
-        return ""
-
-    if not isinstance(value, str):
-        value = str(value)
-
-    try:
-        template = ctx.eval_ctx.environment.from_string(value)
-        return await template.render_async(**ctx.get_all())
-    except Exception:
-        LOGGER.exception(f"Failed to render template {value=}")
-        raise
+    return TemplateRenderer(templates, cache_path / "templates" if cache_path else None)
 
 
 def tidy_html(content: str) -> str:
@@ -128,9 +338,40 @@ def tidy_html(content: str) -> str:
     - Lines with no non-whitespace characters are removed
     - Repeated line breaks are collapsed
     """
-    lines = []
-    for source_line in content.splitlines():
-        line = source_line.rstrip()
-        if line:
-            lines.append(line)
-    return "\n".join(lines)
+    return _tidy_lines(content.splitlines())
+
+
+def tidy_html_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Apply `tidy_html` to content as it arrives in `chunks`, yielding tidied chunks that
+    join up to the same result.
+
+    Small chunks are gathered up to `TIDY_CHUNK_SIZE` before tidying, and a line split
+    across chunks is held back until it's complete. A line break split across chunks
+    only ever leaves an empty line behind, which is removed anyway.
+    """
+    pending: list[str] = []
+    size = 0
+    separator = ""
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size < TIDY_CHUNK_SIZE:
+            continue
+
+        lines = "".join(pending).splitlines(keepends=True)
+        # The last line may continue in the next chunk, and isn't counted, so a long
+        # line is only joined up again each `TIDY_CHUNK_SIZE` rather than each chunk
+        pending, size = [], 0
+        if lines[-1].splitlines()[0] == lines[-1]:
+            pending.append(lines.pop())
+        if tidied := _tidy_lines(lines):
+            yield separator + tidied
+            separator = "\n"
+
+    if tidied := _tidy_lines("".join(pending).splitlines()):
+        yield separator + tidied
+
+
+def _tidy_lines(lines: Iterable[str]) -> str:
+    return "\n".join(filter(None, map(str.rstrip, lines)))
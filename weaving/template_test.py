@@ -0,0 +1,106 @@
+import asyncio
+import pathlib
+
+import jinja2
+import pytest
+
+from weaving import config_test, markdown, template, trace
+
+
+def test_bytecode_cache(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "page.html").write_text("Hello {{ name }}!")
+
+    renderer = template.TemplateRenderer(templates, tmp_path / "cache")
+    assert renderer.compile_templates() == ["page.html"]
+    compiled = set((tmp_path / "cache").glob("*/*"))
+    assert len(compiled) == 1
+
+    # Another renderer loads the compiled template instead of compiling it again
+    def compile_source(*_args: object, **_kwargs: object) -> None:
+        raise AssertionError("Template was compiled from source")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(jinja2.Environment, "compile", compile_source)
+        renderer = template.TemplateRenderer(templates, tmp_path / "cache")
+        page = renderer.env.get_template("page.html")
+        assert page.render(name="world") == "Hello world!"
+
+    # Changing a template's source compiles it again
+    (templates / "page.html").write_text("Goodbye {{ name }}!")
+    renderer = template.TemplateRenderer(templates, tmp_path / "cache")
+    assert renderer.env.get_template("page.html").render(name="world") == (
+        "Goodbye world!"
+    )
+    assert len(set((tmp_path / "cache").glob("*/*")) - compiled) == 1
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "<p>No Jinja syntax &amp; no trailing newline</p>",
+        "<p>Trailing newline</p>\n",
+        "<p>Two trailing newlines</p>\n\n",
+        "Windows\r\nand old Mac\rnewlines\r\n",
+        "<p>{{ 1 + 1 }} and {# a comment #}</p>\n",
+        "{% if true %}yes{% endif %}",
+    ],
+)
+@pytest.mark.parametrize("is_async", [False, True])
+def test_render_filter(tmp_path: pathlib.Path, content: str, *, is_async: bool) -> None:
+    renderer = template.TemplateRenderer(tmp_path, is_async=is_async)
+    page = renderer.env.from_string(
+        "{% autoescape false %}{{ x|render }}{% endautoescape %}"
+    )
+
+    async def render() -> tuple[str, str]:
+        expected = await renderer.env.from_string(content).render_async()
+        return expected, await page.render_async(x=content)
+
+    if is_async:
+        expected, rendered = asyncio.run(render())
+    else:
+        expected = renderer.env.from_string(content).render()
+        rendered = page.render(x=content)
+    assert rendered == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 8, 1000])
+def test_tidy_html_chunks(monkeypatch: pytest.MonkeyPatch, chunk_size: int) -> None:
+    monkeypatch.setattr(template, "TIDY_CHUNK_SIZE", 4)
+    content = "\n  \n<html>  \r\n\r\n<body>\t\n  <p>A long line of text</p> \rEnd\n\n\n"
+    chunks = [
+        content[start : start + chunk_size]
+        for start in range(0, len(content), chunk_size)
+    ]
+    assert "".join(template.tidy_html_chunks(chunks)) == template.tidy_html(content)
+
+
+def test_generate__trace(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "default.html").write_text("<p>{{ ctx.content }}</p>\n\n")
+    ctx = template.TemplateContext(
+        content="Hello",
+        frontmatter=markdown.parse_frontmatter(
+            config_test.fake_test_config(
+                site_name="test", templates=tmp_path, pages=tmp_path
+            ),
+            tmp_path / "index.md",
+            {},
+        ),
+        rendered_at=markdown.get_rendered_at(),
+        modified_at=markdown.get_rendered_at(),
+        git_sha=None,
+    )
+
+    with trace.tracing(trace.Tracer()) as tracer:
+        chunks = template.TemplateRenderer(tmp_path).generate(ctx)
+        assert "".join(chunks) == "<p>Hello</p>"
+
+    # Rendering and tidying are timed apart, not including any work between chunks
+    assert [(span.name, span.depth) for span in tracer.spans] == [
+        ("jinja", 0),
+        ("tidy_html", 0),
+    ]
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import dataclasses
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from weaving import logging
+
+if TYPE_CHECKING:
+    import pathlib
+    from collections.abc import Callable, Iterable, Iterator
+
+LOGGER = logging.getLogger()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Span:
+    """A single timed unit of work done during a build."""
+
+    name: str
+    """The name of the work, such as `markdown` or `write`."""
+
+    path: str | None
+    """The source file the work was done for, if any."""
+
+    start_ns: int
+    """Wall clock time the work started at, in nanoseconds since the epoch."""
+
+    duration_ns: int
+    """How long the work took, in nanoseconds."""
+
+    pid: int
+    """The process the work was done in."""
+
+    tid: int
+    """The thread or task the work was done in."""
+
+    depth: int
+    """How many other spans the span is nested inside of."""
+
+
+class Tracer:
+    """
+    Collect spans for the work done during a build, for output as a Chrome trace-event
+    file and a summary of the slowest stages and pages.
+
+    Spans are recorded by `span` while a tracer is active through `tracing`. Every
+    asyncio task is given its own track in the trace, so the concurrent workers of each
+    pipeline stage show up side by side.
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._tracks: dict[Any, int] = {}
+
+    def add(self, spans: list[Span]) -> None:
+        """Add spans recorded by another tracer, such as in a worker process."""
+        self.spans.extend(spans)
+
+    def record(self, name: str, start_ns: int, end_ns: int) -> None:
+        """Record a span of work done by the current task."""
+        try:
+            track_key: Any = asyncio.current_task() or threading.get_ident()
+        except RuntimeError:
+            track_key = threading.get_ident()
+        tid = self._tracks.setdefault(track_key, len(self._tracks) + 1)
+        self.spans.append(
+            Span(
+                name=name,
+                path=_path.get(),
+                start_ns=start_ns,
+                duration_ns=end_ns - start_ns,
+                pid=os.getpid(),
+                tid=tid,
+                depth=_depth.get(),
+            )
+        )
+
+    def write(self, path: pathlib.Path) -> None:
+        """Write every span to `path` in the Chrome trace-event JSON format."""
+        events = [
+            {
+                "name": span.name,
+                "cat": "weaving",
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": span.duration_ns / 1000,
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": {"path": span.path} if span.path else {},
+            }
+            for span in self.spans
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}),
+            encoding="utf-8",
+        )
+
+    def summarize(self, limit: int = 10) -> str:
+        """
+        Summarize the total time spent in each stage, and the `limit` pages that took
+        the longest to build.
+
+        Nested spans are included in their parent's stage total as well as their own, so
+        stage totals can add up to more than the build took.
+        """
+        stages: dict[str, list[int]] = {}
+        pages: dict[str, int] = {}
+        for span in self.spans:
+            stages.setdefault(span.name, []).append(span.duration_ns)
+            if span.path and not span.depth:
+                pages[span.path] = pages.get(span.path, 0) + span.duration_ns
+
+        lines = [
+            f"{'stage':<16} {'count':>7} {'total':>12} {'mean':>10} {'max':>10}",
+        ]
+        for name, durations in sorted(
+            stages.items(), key=lambda item: sum(item[1]), reverse=True
+        ):
+            lines.append(
+                f"{name:<16} {len(durations):>7} {_ms(sum(durations)):>12} "
+                f"{_ms(sum(durations) // len(durations)):>10} "
+                f"{_ms(max(durations)):>10}"
+            )
+
+        lines.extend(["", f"{'slowest pages':<56} {'total':>12}"])
+        for path, duration in sorted(
+            pages.items(), key=lambda item: item[1], reverse=True
+        )[:limit]:
+            lines.append(f"{path:<56} {_ms(duration):>12}")
+
+        return "\n".join(lines)
+
+
+_tracer: contextvars.ContextVar[Tracer | None] = contextvars.ContextVar(
+    "tracer", default=None
+)
+_path: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "trace_path", default=None
+)
+_depth: contextvars.ContextVar[int] = contextvars.ContextVar("trace_depth", default=0)
+
+
+def _ms(duration_ns: int) -> str:
+    return f"{duration_ns / 1_000_000:.3f}ms"
+
+
+def is_tracing() -> bool:
+    """Check if spans are being recorded by a `Tracer`."""
+    return _tracer.get() is not None
+
+
+def get_state() -> tuple[str | None, int]:
+    """
+    Get the source file spans are currently recorded for, and how deeply they are
+    nested, to pass to `run_traced`.
+    """
+    return _path.get(), _depth.get()
+
+
+@contextlib.contextmanager
+def tracing(tracer: Tracer) -> Iterator[Tracer]:
+    """Record spans with `tracer` for the duration of the context."""
+    token = _tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+
+
+@contextlib.contextmanager
+def source(path: str | None) -> Iterator[None]:
+    """Record spans in the context for the source file at `path`."""
+    token = _path.set(path)
+    try:
+        yield
+    finally:
+        _path.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Record the time taken by the work done in the context, if a `Tracer` is active.
+
+    The span is attributed to the source file set by the surrounding `source`.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield
+        return
+
+    start_ns = time.time_ns()
+    token = _depth.set(_depth.get() + 1)
+    try:
+        yield
+    finally:
+        _depth.reset(token)
+        tracer.record(name, start_ns, time.time_ns())
+
+
+class Stopwatch:
+    """
+    Time work done in many separate steps, like producing each chunk of a stream, and
+    record it as one span of the total time taken, if a `Tracer` is active.
+
+    The span starts when the first step does, and lasts for the total time of every
+    step, so it doesn't cover the time spent on other work in between.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.duration_ns = 0
+        self._tracer = _tracer.get()
+        self._start_ns: int | None = None
+        self._since_ns: int | None = None
+
+    @contextlib.contextmanager
+    def running(self) -> Iterator[None]:
+        """Time the work done in the context as one step."""
+        if self._tracer is None:
+            yield
+            return
+
+        self._resume()
+        try:
+            yield
+        finally:
+            self._pause()
+
+    @contextlib.contextmanager
+    def paused(self) -> Iterator[None]:
+        """Leave the work done in the context out of the step that's running, if any."""
+        if self._since_ns is None:
+            yield
+            return
+
+        self._pause()
+        try:
+            yield
+        finally:
+            self._resume()
+
+    def record(self) -> None:
+        """Record the total time taken by every step so far as a span."""
+        if self._tracer and self._start_ns is not None:
+            self._tracer.record(
+                self.name, self._start_ns, self._start_ns + self.duration_ns
+            )
+
+    def _resume(self) -> None:
+        self._since_ns = time.time_ns()
+        if self._start_ns is None:
+            self._start_ns = self._since_ns
+
+    def _pause(self) -> None:
+        if self._since_ns is not None:
+            self.duration_ns += time.time_ns() - self._since_ns
+            self._since_ns = None
+
+
+def timed[T](
+    items: Iterable[T], stopwatch: Stopwatch, *, pause: Stopwatch | None = None
+) -> Iterator[T]:
+    """
+    Iterate over `items`, timing each step of the iteration with `stopwatch`.
+
+    If the items are consumed by work timed with another stopwatch, pass it as `pause`
+    to leave producing the items out of that work's time.
+    """
+    iterator = iter(items)
+    while True:
+        with pause.paused() if pause else contextlib.nullcontext(), stopwatch.running():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def add(spans: list[Span]) -> None:
+    """Add spans recorded by another tracer to the active `Tracer`, if any."""
+    if tracer := _tracer.get():
+        tracer.add(spans)
+
+
+def run_traced[T](
+    state: tuple[str | None, int], func: Callable[..., T], *args: Any
+) -> tuple[T, list[Span]]:
+    """
+    Run `func` with a new `Tracer`, returning its result and the spans it recorded.
+
+    This is used to collect the spans of work done in worker processes, `state` is the
+    result of `get_state` in the process that is waiting on the work.
+    """
+    path, depth = state
+    token = _depth.set(depth)
+    try:
+        with tracing(Tracer()) as tracer, source(path):
+            result = func(*args)
+    finally:
+        _depth.reset(token)
+
+    # Work in a worker process is done one call at a time, so it all shares one track
+    return result, [dataclasses.replace(span, tid=0) for span in tracer.spans]
@@ -0,0 +1,89 @@
+import json
+import pathlib
+import time
+from collections.abc import Iterator
+
+from weaving import trace
+
+
+def test_span() -> None:
+    with trace.span("untraced"):
+        pass
+
+    with trace.tracing(trace.Tracer()) as tracer:
+        with trace.source("a.md"), trace.span("outer"), trace.span("inner"):
+            pass
+        with trace.span("no_source"):
+            pass
+
+    assert [(s.name, s.path, s.depth) for s in tracer.spans] == [
+        ("inner", "a.md", 1),
+        ("outer", "a.md", 0),
+        ("no_source", None, 0),
+    ]
+    assert not trace.is_tracing()
+
+
+def test_stopwatch() -> None:
+    untraced = trace.Stopwatch("untraced")
+    assert list(trace.timed("ab", untraced)) == ["a", "b"]
+    untraced.record()
+
+    with trace.tracing(trace.Tracer()) as tracer, trace.source("a.md"):
+        stopwatch = trace.Stopwatch("steps")
+        assert list(trace.timed("ab", stopwatch)) == ["a", "b"]
+        with stopwatch.running():
+            pass
+        trace.Stopwatch("unused").record()
+        stopwatch.record()
+
+    [span] = tracer.spans
+    assert (span.name, span.path, span.depth) == ("steps", "a.md", 0)
+    assert span.duration_ns == stopwatch.duration_ns
+    assert not untraced.duration_ns
+
+
+def test_stopwatch__pause() -> None:
+    def slow_items() -> Iterator[int]:
+        for item in range(3):
+            time.sleep(0.01)
+            yield item
+
+    with trace.tracing(trace.Tracer()):
+        producing = trace.Stopwatch("producing")
+        consuming = trace.Stopwatch("consuming")
+        with consuming.running():
+            items = list(trace.timed(slow_items(), producing, pause=consuming))
+
+    # Producing the items is left out of the time spent consuming them
+    assert items == [0, 1, 2]
+    assert consuming.duration_ns < producing.duration_ns / 10
+
+
+def test_run_traced() -> None:
+    def work(value: str) -> str:
+        with trace.span("work"):
+            return value.upper()
+
+    result, spans = trace.run_traced(("a.md", 1), work, "hello")
+    assert result == "HELLO"
+    assert [(s.name, s.path, s.depth, s.tid) for s in spans] == [("work", "a.md", 1, 0)]
+
+
+def test_write(tmp_path: pathlib.Path) -> None:
+    with trace.tracing(trace.Tracer()) as tracer, trace.source("a.md"):
+        with trace.span("markdown"):
+            pass
+        with trace.span("write"):
+            pass
+
+    tracer.write(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert [(e["name"], e["ph"], e["args"]) for e in events] == [
+        ("markdown", "X", {"path": "a.md"}),
+        ("write", "X", {"path": "a.md"}),
+    ]
+
+    summary = tracer.summarize()
+    assert "markdown" in summary
+    assert "a.md" in summary
@@ -10,7 +10,7 @@ import aiohttp
 import aiostream
 import bs4
 
-from weaving import config, errors, markdown
+from weaving import config, errors, markdown, site_model
 
 if TYPE_CHECKING:
     import pathlib
@@ -43,11 +43,14 @@ class Validator:
         """
         Validate markdown sources, yielding validation errors as they are discovered.
         """
-        async for page in markdown.find_markdown(self.cfg.pages):
-            content, fm = await markdown.load_markdown(self.cfg, page)
+        site = await site_model.scan_site_model(self.cfg)
+        for page, summary in site.find_pages(self.cfg.pages):
+            fm = markdown.parse_frontmatter(self.cfg, page, summary.frontmatter)
 
             meta = fm.meta or {}
-            if not content and meta.get("validation", {}).get("content", True):
+            if not summary.has_content and meta.get("validation", {}).get(
+                "content", True
+            ):
                 yield errors.ValidationError(file=page, error="content: page is empty")
 
             for error in fm.validate_frontmatter():
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
+import functools
+import multiprocessing
+import os
+from typing import TYPE_CHECKING, Any, Self
+
+from weaving import cache, config, highlight, logging, markdown, template, trace
+
+if TYPE_CHECKING:
+    import datetime
+    import pathlib
+    import types
+    from collections.abc import Callable, Iterator
+
+    from weaving import frontmatter, pymdx_page_info
+
+LOGGER = logging.getLogger()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class PageRecord:
+    """
+    Compact, picklable description of a markdown page to render.
+
+    Records are sent to worker processes, so they hold the raw frontmatter values rather
+    than a `frontmatter.PageFrontmatter` and the full site config it references.
+    """
+
+    path: pathlib.Path
+    """The path to the source markdown page."""
+
+    content: str
+    """The content of the page, already rendered from markdown to HTML."""
+
+    frontmatter: dict[str, Any]
+    """The raw YAML frontmatter values of the page."""
+
+    modified_at: datetime.datetime
+    """The date and time the page source was last modified."""
+
+    git_sha: str | None
+    """The git SHA of the current HEAD commit during the build process."""
+
+    info: pymdx_page_info.PageInfo | None = None
+    """Details of the page's content captured while rendering it from markdown."""
+
+
+class Renderer:
+    """
+    Render markdown content and pages, either in-process or on a pool of worker
+    processes, depending on `cfg.jobs`.
+
+    Markdown conversion and Jinja rendering are CPU bound, so running them on the event
+    loop renders every page on a single core regardless of how they are gathered.
+    In-process, templates are rendered on a thread instead, so rendering a page doesn't
+    stall the other pipeline stages, even if it still only uses one core.
+
+    When `cfg.cache` is set, rendered markdown is kept in a persistent cache keyed by
+    the markdown content, so unchanged content is only ever rendered once.
+    """
+
+    def __init__(self, cfg: config.SiteGeneratorConfig) -> None:
+        self.cfg = cfg
+        self._pool: concurrent.futures.ProcessPoolExecutor | None = None
+        self._cache = cache.DiskCache(cfg.cache / "render") if cfg.cache else None
+        highlight.configure(cfg)
+
+        self.jobs = cfg.jobs or os.process_cpu_count() or 1
+        if self.jobs > 1:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_worker,
+                initargs=(cfg,),
+            )
+            LOGGER.debug(f"Rendering pages on {self.jobs} worker processes")
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shutdown any worker processes, cancelling any outstanding work."""
+        if self._pool:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def render_markdown(
+        self, content: str | None, profile: frontmatter.MarkdownProfile = "auto"
+    ) -> markdown.RenderedMarkdown:
+        """Render Markdown content to HTML with the Markdown extension `profile`."""
+        if not content:
+            return markdown.RenderedMarkdown()
+
+        key = markdown.get_render_cache_key(content, profile)
+        if self._cache and (cached := self._cache.get_text(key)) is not None:
+            return markdown.RenderedMarkdown.model_validate_json(cached)
+
+        if self._pool:
+            rendered = await self._run_in_pool(
+                functools.partial(_render_markdown, profile=profile), content
+            )
+        else:
+            rendered = await markdown.render(content, profile)
+
+        if self._cache:
+            self._cache.set_text(key, rendered.model_dump_json())
+        return rendered
+
+    @property
+    def streams(self) -> bool:
+        """
+        Whether pages are rendered in-process, where `stream_page` streams them as
+        they're rendered, rather than rendering them whole on a worker process.
+        """
+        return not self._pool
+
+    async def render_page(self, record: PageRecord) -> str:
+        """Render a page's template into the HTML contents of its output file."""
+        if not self._pool:
+            return await asyncio.to_thread(render_page, self.cfg, record)
+        return await self._run_in_pool(_render_page, record)
+
+    def stream_page(self, record: PageRecord) -> Iterator[str]:
+        """
+        Render a page's template into the HTML contents of its output file, in chunks
+        as it's rendered, when pages are rendered in-process, see `streams`.
+        """
+        if self._pool:
+            raise RuntimeError("Pages rendered on worker processes can't be streamed")
+        return stream_page(self.cfg, record)
+
+    async def _run_in_pool[T](self, func: Callable[[Any], T], arg: Any) -> T:
+        """
+        Run `func` on a worker process, collecting the spans it records when the build
+        is being traced.
+        """
+        if not self._pool:
+            raise RuntimeError("Render worker pool is not running")
+
+        loop = asyncio.get_running_loop()
+        if not trace.is_tracing():
+            return await loop.run_in_executor(self._pool, func, arg)
+
+        result, spans = await loop.run_in_executor(
+            self._pool, trace.run_traced, trace.get_state(), func, arg
+        )
+        trace.add(spans)
+        return result
+
+
+def render_page(cfg: config.SiteGeneratorConfig, record: PageRecord) -> str:
+    """Render a page's template into the HTML contents of its output file."""
+    ctx = _get_page_context(cfg, record)
+    return template.jinja(cfg.templates, cfg.cache).render(ctx)
+
+
+def stream_page(cfg: config.SiteGeneratorConfig, record: PageRecord) -> Iterator[str]:
+    """
+    Render a page's template into the HTML contents of its output file, in chunks as
+    it's rendered.
+    """
+    ctx = _get_page_context(cfg, record)
+    return template.jinja(cfg.templates, cfg.cache).generate(ctx)
+
+
+def _get_page_context(
+    cfg: config.SiteGeneratorConfig, record: PageRecord
+) -> template.TemplateContext:
+    return template.TemplateContext(
+        content=record.content,
+        frontmatter=markdown.parse_frontmatter(cfg, record.path, record.frontmatter),
+        rendered_at=markdown.get_rendered_at(),
+        modified_at=record.modified_at,
+        git_sha=record.git_sha,
+        info=record.info,
+    )
+
+
+_warm_renderer: Renderer | None = None
+_keep_warm = False
+
+
+@contextlib.contextmanager
+def keep_warm() -> Iterator[None]:
+    """
+    Keep the most recently used `Renderer` and its worker processes running between
+    builds for the duration of the context, for long-running processes like the daemon.
+    """
+    global _keep_warm, _warm_renderer  # noqa: PLW0603
+    _keep_warm = True
+    try:
+        yield
+    finally:
+        _keep_warm = False
+        if _warm_renderer:
+            _warm_renderer.close()
+            _warm_renderer = None
+
+
+@contextlib.contextmanager
+def open_renderer(cfg: config.SiteGeneratorConfig) -> Iterator[Renderer]:
+    """
+    Open a `Renderer` for a build, closing it once the build is done.
+
+    Inside `keep_warm`, the renderer is instead kept open and reused by the next build
+    with the same config.
+    """
+    global _warm_renderer  # noqa: PLW0603
+    if not _keep_warm:
+        with Renderer(cfg) as renderer:
+            yield renderer
+        return
+
+    if _warm_renderer and _warm_renderer.cfg != cfg:
+        _warm_renderer.close()
+        _warm_renderer = None
+    if not _warm_renderer:
+        _warm_renderer = Renderer(cfg)
+    yield _warm_renderer
+
+
+# The remaining functions only run inside worker processes, where each worker keeps its
+# own config and event loop for its whole lifetime.
+
+_worker_config: config.SiteGeneratorConfig | None = None
+_worker_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _initialize_worker(cfg: config.SiteGeneratorConfig) -> None:
+    global _worker_config, _worker_loop  # noqa: PLW0603
+    _worker_config = cfg
+    _worker_loop = asyncio.new_event_loop()
+    logging.configure_logging(cfg)
+    highlight.configure(cfg)
+
+
+def _render_markdown(
+    content: str | None, profile: frontmatter.MarkdownProfile
+) -> markdown.RenderedMarkdown:
+    if not _worker_loop:
+        raise RuntimeError("Render worker process has not been initialised")
+    return _worker_loop.run_until_complete(markdown.render(content, profile))
+
+
+def _render_page(record: PageRecord) -> str:
+    if not _worker_config:
+        raise RuntimeError("Render worker process has not been initialised")
+    return render_page(_worker_config, record)
@@ -0,0 +1,494 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import ctypes
+import dataclasses
+import errno
+import filecmp
+import functools
+import os
+import secrets
+import shutil
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Self
+
+from weaving import logging, trace
+
+if TYPE_CHECKING:
+    import pathlib
+    import types
+    from collections.abc import Callable, Iterable, Iterator
+    from typing import BinaryIO
+
+    from weaving.config import CopyMethod
+
+LOGGER = logging.getLogger()
+
+WRITE_BUFFER_SIZE = 64 * 1024
+"""The amount of streamed output `OutputWriter.write_chunks` holds before writing it."""
+
+
+class Generation:
+    """
+    A new generation of an output directory, written to a staging directory next to the
+    live output and swapped in by `commit` once it is complete.
+
+    An `OutputWriter` for the generation redirects files written under the live output
+    directory into the staging directory. Readers of the live output, like the dev
+    server, never see a partial site, and a failed build leaves the previous generation
+    untouched.
+    """
+
+    def __init__(self, output: pathlib.Path) -> None:
+        self.output = output
+        self.staging = output.with_name(f".{output.name}.staging")
+        self._roots = {output, output.resolve()}
+        self._committed = False
+
+    def __enter__(self) -> Self:
+        shutil.rmtree(self.staging, ignore_errors=True)
+        self.staging.mkdir(parents=True)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        if not self._committed:
+            shutil.rmtree(self.staging, ignore_errors=True)
+
+    def commit(self) -> None:
+        """Swap the staging directory in as the live output directory."""
+        self._committed = True
+        if not self.output.exists():
+            self.staging.rename(self.output)
+        elif _exchange(self.staging, self.output):
+            shutil.rmtree(self.staging)
+        else:
+            # Without an atomic exchange, the output is missing only between renames
+            previous = self.output.with_name(f".{self.output.name}.previous")
+            shutil.rmtree(previous, ignore_errors=True)
+            self.output.rename(previous)
+            self.staging.rename(self.output)
+            shutil.rmtree(previous)
+
+        LOGGER.debug(f"Swapped new generation into {self.output}")
+
+    def get_staged_path(self, path: pathlib.Path) -> pathlib.Path:
+        """Get the path in the staging directory for a path in the live output."""
+        for root in self._roots:
+            if path.is_relative_to(root):
+                return self.staging / path.relative_to(root)
+        return path
+
+
+@dataclasses.dataclass(slots=True)
+class WriteStats:
+    """Counts and timings of the output file I/O done by an `OutputWriter`."""
+
+    written: int = 0
+    """Files written or copied."""
+
+    linked: int = 0
+    """Files hard-linked from the previous generation."""
+
+    skipped: int = 0
+    """Files not written, because they already held identical contents."""
+
+    bytes: int = 0
+    """Total size of the files written or copied."""
+
+    io_ns: int = 0
+    """Total time spent on output file I/O, across every I/O thread."""
+
+    def format(self) -> str:
+        """Format the stats as a short human readable summary."""
+        return (
+            f"{self.written} files written ({self.bytes / 1024:.1f}KiB), "
+            f"{self.linked} linked, {self.skipped} unchanged, "
+            f"{self.io_ns / 1_000_000:.3f}ms of I/O"
+        )
+
+
+class OutputWriter:
+    """
+    Write output files on a pool of I/O threads, so blocking file I/O never stalls the
+    event loop.
+
+    Writes are skipped when the file already holds identical contents. When writing a
+    `Generation`, files under the live output directory are written to its staging
+    directory instead, and files identical to the previous generation are hard-linked
+    from it rather than written again.
+
+    Copied files are copied with `copy_method`:
+
+    - `"auto"` clones the file with a reflink where the file system supports it, then
+      falls back to `os.copy_file_range`, then to a regular copy.
+    - `"reflink"` only clones the file, failing on file systems without reflinks.
+    - `"hardlink"` hard-links the output to the source file, so editing the output in
+      place edits the source.
+    - `"copy"` always does a regular copy.
+    """
+
+    def __init__(
+        self,
+        generation: Generation | None = None,
+        *,
+        max_workers: int = 8,
+        copy_method: CopyMethod = "auto",
+    ) -> None:
+        self.generation = generation
+        self.copy_method: CopyMethod = copy_method
+        self.stats = WriteStats()
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="weaving-io"
+        )
+        self._lock = threading.Lock()
+        self._directories: set[pathlib.Path] = set()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Wait for any outstanding I/O, then shutdown the I/O threads."""
+        self._pool.shutdown()
+
+    async def write_text(self, path: pathlib.Path, content: str) -> bool:
+        """
+        Write `content` to an output file, creating any parent directories as required.
+
+        Returns `True` if the file was written, rather than skipped or linked.
+        """
+        return await self._run(self._write_bytes, path, content.encode("utf-8"))
+
+    async def write_chunks(self, path: pathlib.Path, chunks: Iterable[str]) -> bool:
+        """
+        Write text streamed in `chunks` to an output file, creating any parent
+        directories as required.
+
+        Chunks are pulled in batches of up to `WRITE_BUFFER_SIZE` on a worker thread, so
+        chunks that are rendered as they're pulled, like those of a streamed template,
+        never block the event loop.
+
+        Output that fits in one batch is written like `write_text`. Larger output is
+        written to a temporary file next to the output file as it arrives, then moved
+        into place unless the output file already holds identical contents.
+
+        Returns `True` if the file was written, rather than skipped or linked.
+        """
+        iterator = iter(chunks)
+        buffer = bytearray()
+        partial: _PartialFile | None = None
+        try:
+            while not await asyncio.to_thread(_fill_buffer, iterator, buffer):
+                if not partial:
+                    partial = await self._run(self._open_partial, path)
+                await self._run(self._write_partial, partial, bytes(buffer))
+                buffer.clear()
+
+            if not partial:
+                return await self._run(self._write_bytes, path, bytes(buffer))
+            await self._run(self._write_partial, partial, bytes(buffer))
+            return await self._run(self._commit_partial, path, partial)
+        finally:
+            if partial:
+                await self._run(partial.discard)
+
+    async def copy_file(self, src: pathlib.Path, dest: pathlib.Path) -> bool:
+        """
+        Copy `src` to an output file, creating any parent directories as required.
+
+        Returns `True` if the file was copied, rather than skipped or linked.
+        """
+        return await self._run(self._copy_file, src, dest)
+
+    async def keep(self, path: pathlib.Path) -> bool:
+        """
+        Keep an output file from the previous generation in the new generation
+        unchanged, returns `False` if the file no longer exists.
+        """
+        return await self._run(self._keep, path)
+
+    async def _run[**P, T](
+        self, func: Callable[P, T], *args: P.args, **kwargs: P.kwargs
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._pool, functools.partial(ctx.run, func, *args, **kwargs)
+        )
+
+    def _write_bytes(self, path: pathlib.Path, data: bytes) -> bool:
+        with self._timed(), trace.span("write"):
+            target = self._get_target(path)
+            if target != path and _has_bytes(path, data):
+                return self._link(path, target)
+            if _has_bytes(target, data):
+                self._count(skipped=1)
+                return False
+
+            self._prepare(target)
+            target.write_bytes(data)
+            self._count(written=1, size=len(data))
+            return True
+
+    def _open_partial(self, path: pathlib.Path) -> _PartialFile:
+        with self._timed(), trace.span("write"):
+            target = self._get_target(path)
+            self._make_parents(target)
+            return _PartialFile(target)
+
+    def _write_partial(self, partial: _PartialFile, data: bytes) -> None:
+        with self._timed(), trace.span("write"):
+            partial.file.write(data)
+
+    def _commit_partial(self, path: pathlib.Path, partial: _PartialFile) -> bool:
+        with self._timed(), trace.span("write"):
+            partial.file.close()
+            target = self._get_target(path)
+            if target != path and _has_file(path, partial.path):
+                return self._link(path, target)
+            if _has_file(target, partial.path):
+                self._count(skipped=1)
+                return False
+
+            self._prepare(target)
+            partial.path.rename(target)
+            self._count(written=1, size=target.stat().st_size)
+            return True
+
+    def _copy_file(self, src: pathlib.Path, dest: pathlib.Path) -> bool:
+        with self._timed(), trace.span("write"):
+            target = self._get_target(dest)
+            if target != dest and _has_file(dest, src):
+                return self._link(dest, target)
+            if _has_file(target, src):
+                self._count(skipped=1)
+                return False
+
+            self._prepare(target)
+            _COPY_METHODS[self.copy_method](src, target)
+            self._count(written=1, size=target.stat().st_size)
+            return True
+
+    def _keep(self, path: pathlib.Path) -> bool:
+        target = self._get_target(path)
+        if target == path:
+            return path.is_file()
+
+        with self._timed(), trace.span("write"):
+            try:
+                self._link(path, target)
+            except FileNotFoundError:
+                return False
+            return True
+
+    def _get_target(self, path: pathlib.Path) -> pathlib.Path:
+        return self.generation.get_staged_path(path) if self.generation else path
+
+    def _prepare(self, path: pathlib.Path) -> None:
+        """
+        Make way for a new file at `path`, creating its parent directories the first
+        time they're written to.
+
+        An existing file is removed rather than overwritten, as it may be hard-linked to
+        the same file in another generation.
+        """
+        self._make_parents(path)
+        path.unlink(missing_ok=True)
+
+    def _make_parents(self, path: pathlib.Path) -> None:
+        """Create the parent directories of `path` the first time they're written to."""
+        if path.parent not in self._directories:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                self._directories.update([path.parent, *path.parent.parents])
+
+    def _link(self, src: pathlib.Path, dest: pathlib.Path) -> bool:
+        """
+        Hard-link `src` to `dest`, falling back to copying it on file systems without
+        hard links. Returns `True` if the file had to be copied.
+        """
+        self._prepare(dest)
+        try:
+            dest.hardlink_to(src)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copy(src, dest)
+            self._count(written=1, size=dest.stat().st_size)
+            return True
+
+        self._count(linked=1)
+        return False
+
+    def _count(
+        self, *, written: int = 0, linked: int = 0, skipped: int = 0, size: int = 0
+    ) -> None:
+        with self._lock:
+            self.stats.written += written
+            self.stats.linked += linked
+            self.stats.skipped += skipped
+            self.stats.bytes += size
+
+    @contextlib.contextmanager
+    def _timed(self) -> Iterator[None]:
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration_ns = time.perf_counter_ns() - start_ns
+            with self._lock:
+                self.stats.io_ns += duration_ns
+
+
+class _PartialFile:
+    """A temporary file next to an output file, that output is streamed into."""
+
+    def __init__(self, target: pathlib.Path) -> None:
+        # Created exclusively, with the same permissions as any other output file
+        self.path = target.with_name(f".{target.name}.{secrets.token_hex(4)}.partial")
+        self.file: BinaryIO = self.path.open("xb")
+
+    def discard(self) -> None:
+        """Close and remove the file, if it wasn't moved into place."""
+        self.file.close()
+        self.path.unlink(missing_ok=True)
+
+
+def _fill_buffer(chunks: Iterator[str], buffer: bytearray) -> bool:
+    """
+    Add chunks to `buffer` until it holds at least `WRITE_BUFFER_SIZE` bytes, returning
+    `True` once every chunk has been added.
+    """
+    for chunk in chunks:
+        buffer += chunk.encode("utf-8")
+        if len(buffer) >= WRITE_BUFFER_SIZE:
+            return False
+    return True
+
+
+def _has_bytes(path: pathlib.Path, data: bytes) -> bool:
+    try:
+        return path.stat().st_size == len(data) and path.read_bytes() == data
+    except FileNotFoundError:
+        return False
+
+
+def _has_file(path: pathlib.Path, src: pathlib.Path) -> bool:
+    try:
+        return filecmp.cmp(src, path, shallow=False)
+    except FileNotFoundError:
+        return False
+
+
+# From linux/fs.h, clones the whole of one file into another on CoW file systems
+_FICLONE = 0x40049409
+
+
+def _copy_auto(src: pathlib.Path, dest: pathlib.Path) -> None:
+    with src.open("rb") as src_file, dest.open("wb") as dest_file:
+        if not _clone(src_file.fileno(), dest_file.fileno()):
+            size = os.fstat(src_file.fileno()).st_size
+            if not _copy_range(src_file.fileno(), dest_file.fileno(), size):
+                shutil.copyfileobj(src_file, dest_file)
+    shutil.copymode(src, dest)
+
+
+def _copy_reflink(src: pathlib.Path, dest: pathlib.Path) -> None:
+    with src.open("rb") as src_file, dest.open("wb") as dest_file:
+        if not _clone(src_file.fileno(), dest_file.fileno()):
+            raise OSError(errno.EOPNOTSUPP, "File system does not support reflinks")
+    shutil.copymode(src, dest)
+
+
+def _copy_hardlink(src: pathlib.Path, dest: pathlib.Path) -> None:
+    dest.hardlink_to(src)
+
+
+def _copy(src: pathlib.Path, dest: pathlib.Path) -> None:
+    shutil.copy(src, dest)
+
+
+_COPY_METHODS: dict[CopyMethod, Callable[[pathlib.Path, pathlib.Path], None]] = {
+    "auto": _copy_auto,
+    "reflink": _copy_reflink,
+    "hardlink": _copy_hardlink,
+    "copy": _copy,
+}
+
+
+def _clone(src_fd: int, dest_fd: int) -> bool:
+    """
+    Clone a file with the `FICLONE` ioctl, sharing its blocks rather than copying them.
+    Returns `False` if cloning isn't supported by the platform or file system.
+    """
+    if sys.platform != "linux":
+        return False
+
+    import fcntl  # noqa: PLC0415
+
+    try:
+        fcntl.ioctl(dest_fd, _FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_range(src_fd: int, dest_fd: int, size: int) -> bool:
+    """
+    Copy a file in the kernel with `os.copy_file_range`, without a round trip through
+    user space. Returns `False` if nothing could be copied this way.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    copied = 0
+    while copied < size:
+        try:
+            count = os.copy_file_range(src_fd, dest_fd, size - copied)
+        except OSError:
+            if copied:
+                raise
+            return False
+        if not count:
+            break
+        copied += count
+    return True
+
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+def _exchange(a: pathlib.Path, b: pathlib.Path) -> bool:
+    """
+    Atomically exchange two paths with `renameat2`, on Linux. Returns `False` if the
+    exchange isn't supported by the platform or file system.
+    """
+    if sys.platform != "linux":
+        return False
+
+    renameat2 = getattr(ctypes.CDLL(None, use_errno=True), "renameat2", None)
+    if not renameat2:
+        return False
+
+    result = renameat2(
+        _AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE
+    )
+    return result == 0
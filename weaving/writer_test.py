@@ -0,0 +1,156 @@
+import asyncio
+import pathlib
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from weaving import config, writer
+
+
+def test_write_text(tmp_path: pathlib.Path) -> None:
+    async def run() -> None:
+        with writer.OutputWriter() as output_writer:
+            path = tmp_path / "a" / "index.html"
+            assert await output_writer.write_text(path, "hello")
+            assert path.read_text() == "hello"
+
+            assert not await output_writer.write_text(path, "hello")
+            assert await output_writer.write_text(path, "goodbye")
+            assert path.read_text() == "goodbye"
+
+            stats = output_writer.stats
+            assert (stats.written, stats.linked, stats.skipped) == (2, 0, 1)
+
+    asyncio.run(run())
+
+
+def test_generation(tmp_path: pathlib.Path) -> None:
+    output = tmp_path / "output"
+    for name in ["same", "changed", "kept", "removed"]:
+        (output / f"{name}.html").parent.mkdir(exist_ok=True)
+        (output / f"{name}.html").write_text(name)
+    same_inode = (output / "same.html").stat().st_ino
+
+    async def run(generation: writer.Generation) -> None:
+        with writer.OutputWriter(generation) as output_writer:
+            assert not await output_writer.write_text(output / "same.html", "same")
+            assert await output_writer.write_text(output / "changed.html", "new")
+            assert await output_writer.keep(output / "kept.html")
+            assert not await output_writer.keep(output / "missing.html")
+            stats = output_writer.stats
+            assert (stats.written, stats.linked, stats.skipped) == (1, 2, 0)
+
+    with writer.Generation(output) as generation:
+        asyncio.run(run(generation))
+
+        # The live output is untouched until the generation is committed
+        assert (output / "changed.html").read_text() == "changed"
+        assert (generation.staging / "changed.html").read_text() == "new"
+        generation.commit()
+
+    assert sorted(p.name for p in output.iterdir()) == [
+        "changed.html",
+        "kept.html",
+        "same.html",
+    ]
+    assert (output / "changed.html").read_text() == "new"
+    assert (output / "same.html").stat().st_ino == same_inode
+    assert not generation.staging.exists()
+
+
+def test_generation__failed(tmp_path: pathlib.Path) -> None:
+    output = tmp_path / "output"
+    output.mkdir()
+    (output / "index.html").write_text("old")
+
+    def build() -> None:
+        with writer.Generation(output) as generation:
+            (generation.staging / "index.html").write_text("new")
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        build()
+
+    assert (output / "index.html").read_text() == "old"
+    assert not writer.Generation(output).staging.exists()
+
+
+@pytest.mark.parametrize("copy_method", ["auto", "hardlink", "copy"])
+def test_copy_file(tmp_path: pathlib.Path, copy_method: config.CopyMethod) -> None:
+    src = tmp_path / "src.png"
+    src.write_bytes(b"\x89PNG" * 1024)
+    dest = tmp_path / "output" / "img" / "src.png"
+
+    async def run() -> None:
+        with writer.OutputWriter(copy_method=copy_method) as output_writer:
+            assert await output_writer.copy_file(src, dest)
+            assert not await output_writer.copy_file(src, dest)
+
+    asyncio.run(run())
+    assert dest.read_bytes() == src.read_bytes()
+    assert (dest.stat().st_ino == src.stat().st_ino) == (copy_method == "hardlink")
+
+
+def test_write_chunks(tmp_path: pathlib.Path) -> None:
+    chunks = ["<p>", "streamed" * writer.WRITE_BUFFER_SIZE, "</p>"]
+
+    async def run() -> None:
+        with writer.OutputWriter() as output_writer:
+            small = tmp_path / "small.html"
+            assert await output_writer.write_chunks(small, iter(["a", "b"]))
+            assert small.read_text() == "ab"
+
+            large = tmp_path / "a" / "large.html"
+            assert await output_writer.write_chunks(large, iter(chunks))
+            assert large.read_text() == "".join(chunks)
+            assert not await output_writer.write_chunks(large, iter(chunks))
+
+            stats = output_writer.stats
+            assert (stats.written, stats.linked, stats.skipped) == (2, 0, 1)
+
+    asyncio.run(run())
+    assert sorted(p.name for p in (tmp_path / "a").iterdir()) == ["large.html"]
+
+
+def test_write_chunks__generation(tmp_path: pathlib.Path) -> None:
+    output = tmp_path / "output"
+    output.mkdir()
+    content = "same" * writer.WRITE_BUFFER_SIZE
+    (output / "index.html").write_text(content)
+
+    def fail() -> Iterator[str]:
+        yield "changed" * writer.WRITE_BUFFER_SIZE
+        raise RuntimeError
+
+    async def run(generation: writer.Generation) -> None:
+        with writer.OutputWriter(generation) as output_writer:
+            assert not await output_writer.write_chunks(
+                output / "index.html", iter([content])
+            )
+            with pytest.raises(RuntimeError):
+                await output_writer.write_chunks(output / "failed.html", fail())
+            assert output_writer.stats.linked == 1
+
+    with writer.Generation(output) as generation:
+        asyncio.run(run(generation))
+
+        # A failed stream leaves nothing behind
+        assert [p.name for p in generation.staging.iterdir()] == ["index.html"]
+
+
+def test_write_chunks__thread(tmp_path: pathlib.Path) -> None:
+    threads: list[int] = []
+
+    def render() -> Iterator[str]:
+        threads.append(threading.get_ident())
+        yield "rendered"
+
+    async def run() -> None:
+        with writer.OutputWriter() as output_writer:
+            await output_writer.write_chunks(tmp_path / "index.html", render())
+
+    # Chunks are produced off the event loop's thread
+    asyncio.run(run())
+    assert threads
+    assert threading.get_ident() not in threads